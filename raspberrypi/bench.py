@@ -0,0 +1,284 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import wave
+from dataclasses import replace
+
+import numpy as np
+import sim
+
+# Benchmarks for the servo and audio hot paths, run on the sim backend (mock
+# pins, fake PyAudio), so they work on any machine:
+#
+#   python3 bench.py                         # everything, as a table
+#   python3 bench.py --only audio,udp --json results.json
+#
+# audio    ChatterPi's playback callback time per buffer for each STYLE and
+#          BUFFER_SIZE, the jaw analysis time per window for each STYLE and
+#          JAW_WINDOW, and how late the jaw scheduler writes each target for
+#          each BUFFER_SIZE (the fake stream paced in real time)
+# servo    tick jitter of the motion engine used by servo_run.py
+# udp      servo_server.py command-to-servo latency and throughput
+# trigger  PIR edge / TIMER deadline to ChatterPi's trigger delivery
+#
+# --json writes one record per measurement (name, params, unit, count, mean,
+# p50, p99, max) plus the machine it ran on, to diff between commits.
+
+CHATTERPI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'vendor', 'ChatterPi', 'src')
+STYLES = (0, 1, 2)
+BUFFER_SIZES = (512, 1024, 2048, 4096)
+JAW_WINDOWS = (10, 20, 40)
+TRACK_SECONDS = 4.0
+
+
+def summarize(name, samples, unit='ms', scale=1000.0, **params):
+    samples = np.asarray(samples, dtype=float) * scale
+    record = {'name': name, 'params': params, 'unit': unit, 'count': int(len(samples))}
+    if len(samples):
+        record.update(mean=float(samples.mean()), p50=float(np.percentile(samples, 50)),
+                      p99=float(np.percentile(samples, 99)), max=float(samples.max()))
+    return record
+
+
+def speech_like_wav(path, rate=44100, seconds=TRACK_SECONDS):
+    """Stereo noise in syllable-length bursts, loud enough to open the jaw"""
+    rng = np.random.default_rng(1)
+    n = int(rate * seconds)
+    envelope = (np.sin(2 * np.pi * 3 * np.arange(n) / rate) > 0) * 12000
+    mono = (rng.standard_normal(n) * envelope).clip(-32768, 32767).astype('<i2')
+    wf = wave.open(path, 'wb')
+    wf.setnchannels(2)
+    wf.setsampwidth(2)
+    wf.setframerate(rate)
+    wf.writeframes(np.repeat(mono[:, None], 2, axis=1).tobytes())
+    wf.close()
+
+
+@contextlib.contextmanager
+def chatterpi():
+    """Runs with ChatterPi's modules importable and its config.ini current"""
+    cwd = os.getcwd()
+    if CHATTERPI_DIR not in sys.path:
+        sys.path.insert(0, CHATTERPI_DIR)
+    os.chdir(CHATTERPI_DIR)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+def configure(c, **settings):
+    """Overrides config values in memory (config.ini is left alone)"""
+    c.current = replace(c.current, **settings)
+    vars(c).update(settings)
+
+
+def bench_audio(results, lateness_seconds=TRACK_SECONDS):
+    with chatterpi(), contextlib.redirect_stdout(io.StringIO()):
+        import config as c
+        import audio
+        import jawScheduler
+        import jawTimeline
+        a = audio.AUDIO()
+        window = c.JAW_WINDOW
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'v01.wav')
+            speech_like_wav(path)
+            for style in STYLES:
+                for jaw_window in JAW_WINDOWS:
+                    configure(c, STYLE=style, JAW_WINDOW=jaw_window)
+                    start = time.perf_counter()
+                    timeline = jawTimeline.build(path, a.bandpass())
+                    analysis = (time.perf_counter() - start) / max(1, len(timeline.targets))
+                    results.append(summarize('jaw.analysis_per_window', [analysis],
+                                             style=style, jaw_window=jaw_window,
+                                             windows=len(timeline.targets)))
+                configure(c, JAW_WINDOW=window)
+                for size in BUFFER_SIZES:
+                    configure(c, STYLE=style, BUFFER_SIZE=size, SYNC_MODE='OFF', CROSSFADE=0)
+                    results.append(summarize('audio.callback', play(a, path, size).callback_times,
+                                             style=style, buffer_size=size))
+
+            # the scheduler only keeps time against a stream paced like a sound card
+            path = os.path.join(tmp, 'v02.wav')
+            speech_like_wav(path, seconds=lateness_seconds)
+            a.p.realtime = True
+            for size in BUFFER_SIZES:
+                configure(c, BUFFER_SIZE=size, SYNC_MODE='OFF', CROSSFADE=0)
+                head = jawScheduler.LATENESS.head
+                play(a, path, size)
+                lateness, _ = jawScheduler.LATENESS.since(head)
+                results.append(summarize('jaw.lateness', lateness, buffer_size=size,
+                                         jaw_window=window))
+            a.p.realtime = False
+        a.cleanup()
+
+
+def play(a, path, size):
+    """Plays path as a vocal on a fresh stream of size frames. Returns the stream"""
+    a.mixer.close()
+    a.mixer.frames_per_buffer = size
+    a.play_vocal_track(path)
+    stream = a.mixer.stream
+    a.mixer.close()
+    return stream
+
+
+def bench_servo(results, seconds):
+    with contextlib.redirect_stdout(io.StringIO()):
+        import servo_run
+        servo_run.activate_all_servos()
+        engine = servo_run.engine
+        lateness = []
+        original = engine.jitter.add
+        engine.jitter.add = lambda late: (lateness.append(late), original(late))
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            servo_run.random_head_movement(0.5)
+        engine.jitter.add = original
+    results.append(summarize('servo.tick_jitter', lateness, rate=1 / engine.period))
+
+
+def bench_udp(results, count):
+    with contextlib.redirect_stdout(io.StringIO()):
+        import servo_server
+        from servo_client import ServoClient
+        written = threading.Event()
+        writes = []
+        original = servo_server.set_servo_angle
+
+        def set_servo_angle(servo_name, angle):
+            original(servo_name, angle)
+            writes.append(time.monotonic())
+            written.set()
+
+        servo_server.set_servo_angle = set_servo_angle
+        threading.Thread(target=servo_server.run_blocking, daemon=True).start()
+        port = servo_server.udp_socket.getsockname()[1]
+
+        # latency: one command at a time, send to servo write
+        latencies = []
+        with ServoClient('127.0.0.1', port) as client:
+            for i in range(count):
+                written.clear()
+                sent = time.monotonic()
+                client.send(Base=random.uniform(-30, 30))
+                if written.wait(1.0):
+                    latencies.append(writes[-1] - sent)
+        results.append(summarize('udp.command_to_servo', latencies))
+
+        # throughput: bursts of commands as fast as the client can send them
+        del writes[:]
+        with ServoClient('127.0.0.1', port, seq=1 << 20) as client:
+            start = time.monotonic()
+            for i in range(count * 10):
+                client.send(Base=random.uniform(-30, 30), Pitch=0.0, Tilt=0.0)
+                if i % 50 == 49:
+                    time.sleep(0.001)   # stay inside the socket's receive buffer
+            sent_for = time.monotonic() - start
+        time.sleep(0.2)
+        elapsed = (writes[-1] - start) if writes else sent_for
+        results.append({'name': 'udp.throughput', 'params': {'frames': count * 10, 'axes': 3},
+                        'unit': 'frames/s', 'count': len(writes) // 3,
+                        'mean': len(writes) / 3 / elapsed if elapsed else 0.0,
+                        'delivered': len(writes) / (count * 30)})
+        servo_server.set_servo_angle = original
+
+
+def bench_trigger(results, count):
+    with chatterpi():
+        from gpiozero import Button
+        from gpiozero.pins.mock import MockFactory
+        import triggers
+        factory = MockFactory()
+        pir = Button(23, pull_up=False, pin_factory=factory)
+        trigger = triggers.TriggerScheduler('PIR', 0, pir)
+        delivered = threading.Event()
+        received = []
+
+        def waiter():
+            for i in range(count):
+                trigger.arm()
+                trigger.wait()
+                received.append(time.monotonic())
+                delivered.set()
+
+        thread = threading.Thread(target=waiter, daemon=True)
+        thread.start()
+        latencies = []
+        pin = factory.pin(23)
+        for i in range(count):
+            delivered.clear()
+            time.sleep(0.002)   # let the waiter re-arm
+            sent = time.monotonic()
+            pin.drive_high()
+            if delivered.wait(1.0):
+                latencies.append(received[-1] - sent)
+            pin.drive_low()
+        thread.join(1.0)
+        trigger.close()
+        results.append(summarize('trigger.pir', latencies))
+
+        timer = triggers.TriggerScheduler('TIMER', 0.01)
+        lateness = []
+        for i in range(count):
+            timer.arm()
+            timer.wait()
+            lateness.append(timer.latency)
+        results.append(summarize('trigger.timer', lateness, delay=0.01))
+
+
+BENCHES = ('audio', 'servo', 'udp', 'trigger')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hardware-free benchmarks of the servo and audio hot paths")
+    parser.add_argument('--only', default=','.join(BENCHES),
+                        help="comma separated subset of " + ', '.join(BENCHES))
+    parser.add_argument('--json', metavar='PATH', help="write the results as JSON to PATH")
+    parser.add_argument('--quick', action='store_true', help="fewer iterations")
+    args = parser.parse_args()
+    only = [name.strip() for name in args.only.split(',') if name.strip()]
+    unknown = set(only) - set(BENCHES)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    sim.install()
+    count = 50 if args.quick else 500
+    results = []
+    if 'audio' in only:
+        bench_audio(results, 1.0 if args.quick else TRACK_SECONDS)
+    if 'servo' in only:
+        bench_servo(results, 1.0 if args.quick else 5.0)
+    if 'udp' in only:
+        bench_udp(results, count)
+    if 'trigger' in only:
+        bench_trigger(results, count)
+
+    for r in results:
+        params = ' '.join(f"{k}={v}" for k, v in r['params'].items())
+        if 'p99' in r:
+            print(f"{r['name']:<24} {params:<26} mean {r['mean']:9.3f} p99 {r['p99']:9.3f} "
+                  f"max {r['max']:9.3f} {r['unit']} (n={r['count']})")
+        else:
+            print(f"{r['name']:<24} {params:<26} {r.get('mean', 0):9.1f} {r['unit']} (n={r['count']})")
+
+    if args.json:
+        report = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                  'machine': platform.machine(), 'python': platform.python_version(),
+                  'results': results}
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
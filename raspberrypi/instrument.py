@@ -0,0 +1,226 @@
+import json
+import math
+import socket
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_right
+
+# Lightweight instrumentation for the real-time paths (audio callbacks, servo
+# writes, UDP receive).
+#
+# The hot path only does plain attribute updates: a Counter is incremented and
+# a duration is pushed into a Ring, a fixed-size array written by a single
+# producer without locks. Readers copy whatever the ring holds; a reading
+# that races a write can at worst include one stale sample. Everything heavier
+# (histograms, percentiles, rates) is computed by the reader:
+#
+#   - summary_line() for the periodic log (start_reporter)
+#   - snapshot() as JSON from a localhost UDP endpoint (start_server); query it
+#     with: python3 instrument.py [port]. Every ring reports its head, and a
+#     query can pass the heads of an earlier snapshot to get statistics over
+#     just the samples since then (udp_load.py does this)
+#
+# All instrumentation lives in the module-level registry, so any module can
+# add to it with instrument.counter('name') / instrument.ring('name').
+
+DEFAULT_PORT = 8899
+RING_SIZE = 4096
+# histogram bucket upper bounds in microseconds
+BUCKETS_US = (50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000)
+
+
+class Counter:
+    __slots__ = ('name', 'value', '_last')
+
+    def __init__(self, name):
+        self.name = name
+        self.value = 0
+        self._last = (time.monotonic(), 0)
+
+    def inc(self, n=1):
+        self.value += n
+
+    def rate(self):
+        """Increments per second since the previous call"""
+        now = time.monotonic()
+        then, last = self._last
+        self._last = (now, self.value)
+        return (self.value - last) / (now - then) if now > then else 0.0
+
+
+class Ring:
+    """Fixed-size buffer of the newest samples; one writer, any number of readers"""
+    __slots__ = ('name', 'size', 'mask', 'buf', 'head')
+
+    def __init__(self, name, size=RING_SIZE):
+        # a power of two so the write index is a mask, not a modulo
+        self.size = 1 << max(1, (size - 1).bit_length())
+        self.mask = self.size - 1
+        self.name = name
+        self.buf = array('d', bytes(8 * self.size))
+        self.head = 0       # total samples ever pushed
+
+    def push(self, value):
+        head = self.head
+        self.buf[head & self.mask] = value
+        self.head = head + 1
+
+    def since(self, start):
+        """Samples pushed since head was start (at most the ring size), and the new head"""
+        head = self.head
+        # a start past the head (from before a restart) gives no samples
+        count = max(0, min(head - start, self.size))
+        first = (head - count) & self.mask
+        if first + count <= self.size:
+            samples = self.buf[first:first + count]
+        else:
+            samples = self.buf[first:] + self.buf[:(first + count) - self.size]
+        return samples, head
+
+
+def histogram(samples_s):
+    """Counts per BUCKETS_US bucket (plus one overflow bucket) for samples in seconds"""
+    counts = [0] * (len(BUCKETS_US) + 1)
+    for value in samples_s:
+        counts[bisect_right(BUCKETS_US, value * 1e6)] += 1
+    return counts
+
+
+def _percentile(ordered, p):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(math.ceil(p / 100 * len(ordered))) - 1)]
+
+
+class Registry:
+    def __init__(self):
+        self.counters = {}
+        self.rings = {}
+        self._read = {}     # ring name -> head when the reporter last read it
+        self._lock = threading.Lock()   # only for creating entries, never on the hot path
+
+    def counter(self, name):
+        with self._lock:
+            if name not in self.counters:
+                self.counters[name] = Counter(name)
+            return self.counters[name]
+
+    def ring(self, name, size=RING_SIZE):
+        with self._lock:
+            if name not in self.rings:
+                self.rings[name] = Ring(name, size)
+            return self.rings[name]
+
+    def snapshot(self, consume=False, since=None):
+        """Counters (total and rate) and ring statistics in milliseconds.
+        With consume, rings only report samples since the previous consuming call
+        and counter rates are reset; with since ({ring name: head} from an earlier
+        snapshot) only the samples after those heads; otherwise the whole ring"""
+        report = {'time': time.time(), 'counters': {}, 'rings': {}}
+        for name, counter in list(self.counters.items()):
+            entry = {'total': counter.value}
+            if consume:
+                entry['per_s'] = round(counter.rate(), 2)
+            report['counters'][name] = entry
+        for name, ring in list(self.rings.items()):
+            if consume:
+                start = self._read.get(name, 0)
+            elif since is not None:
+                start = since.get(name, 0)
+            else:
+                start = max(0, ring.head - ring.size)
+            samples, head = ring.since(start)
+            if consume:
+                self._read[name] = head
+            ordered = sorted(samples)
+            report['rings'][name] = {
+                'head': head,
+                'count': len(ordered),
+                'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+                'p50_ms': round(_percentile(ordered, 50) * 1000, 3),
+                'p99_ms': round(_percentile(ordered, 99) * 1000, 3),
+                'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0,
+                'histogram_us': dict(zip([f"<={b}" for b in BUCKETS_US] + ['more'],
+                                         histogram(ordered))),
+            }
+        return report
+
+    def summary_line(self):
+        """One line for the periodic log, covering the time since the last one"""
+        report = self.snapshot(consume=True)
+        parts = []
+        for name, ring in report['rings'].items():
+            if ring['count']:
+                parts.append(f"{name} p50 {ring['p50_ms']:.2f} p99 {ring['p99_ms']:.2f} "
+                             f"max {ring['max_ms']:.2f} ms")
+        for name, counter in report['counters'].items():
+            if counter['total']:
+                parts.append(f"{name} {counter['total']} ({counter['per_s']:g}/s)")
+        return ', '.join(parts) if parts else "no activity"
+
+
+registry = Registry()
+counter = registry.counter
+ring = registry.ring
+
+
+def start_reporter(interval, out=None):
+    """Prints registry.summary_line() every interval seconds from a daemon thread"""
+    def run():
+        while True:
+            time.sleep(interval)
+            print(f"[stats] {registry.summary_line()}", file=out or sys.stdout, flush=True)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def start_server(port=DEFAULT_PORT, host='127.0.0.1'):
+    """Answers any datagram on host:port with the current snapshot as JSON.
+    A datagram holding a JSON object of ring heads limits the rings to the
+    samples since those heads"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+
+    def run():
+        while True:
+            try:
+                data, addr = sock.recvfrom(4096)
+                try:
+                    since = json.loads(data)
+                except ValueError:
+                    since = None
+                if not (isinstance(since, dict) and all(isinstance(head, int) for head in since.values())):
+                    since = None
+                reply = json.dumps(registry.snapshot(since=since)).encode()
+                sock.sendto(reply, addr)
+            except OSError:
+                # a reply too big for one datagram or a vanished client
+                continue
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return sock
+
+
+def query(port=DEFAULT_PORT, host='127.0.0.1', timeout=1.0, since=None):
+    """Fetches a snapshot from a running start_server(); since limits the rings
+    to the samples after an earlier snapshot (pass that snapshot)"""
+    if since is not None:
+        request = json.dumps({name: ring['head'] for name, ring in since['rings'].items()}).encode()
+    else:
+        request = b'stats'
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        sock.sendto(request, (host, port))
+        data, _ = sock.recvfrom(65535)
+    return json.loads(data)
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    try:
+        print(json.dumps(query(port), indent=1))
+    except socket.timeout:
+        print(f"No stats endpoint answering on 127.0.0.1:{port}")
@@ -0,0 +1,164 @@
+import math
+import time
+
+# Multi-axis motion engine shared by servo_run.py, servo_test.py and
+# servo_server.py.
+#
+# All axes are interpolated together on one scheduler tick. The tick runs on
+# monotonic deadlines, so the time spent computing and writing servo values
+# does not add up as drift. Optional per-axis limits are read from the
+# servo_configs entries:
+#   'max_velocity': degrees per second
+#   'max_accel':    degrees per second squared
+
+
+def linear(p):
+    return p
+
+def ease_in(p):
+    return p * p
+
+def ease_out(p):
+    return 1 - (1 - p) * (1 - p)
+
+def ease_in_out(p):
+    # smoothstep: zero velocity at both ends
+    return p * p * (3 - 2 * p)
+
+def cosine(p):
+    return 0.5 - 0.5 * math.cos(math.pi * p)
+
+EASINGS = {
+    'linear': linear,
+    'ease_in': ease_in,
+    'ease_out': ease_out,
+    'ease_in_out': ease_in_out,
+    'cosine': cosine,
+}
+
+# A move is finished once every axis is this close to its target (degrees)
+SETTLE_TOLERANCE = 0.05
+
+
+class JitterStats:
+    """How late each tick fired relative to its deadline, in seconds"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.max = 0.0
+
+    def add(self, lateness):
+        # Welford's running mean/variance
+        self.count += 1
+        delta = lateness - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (lateness - self.mean)
+        self.max = max(self.max, lateness)
+
+    @property
+    def stdev(self):
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def summary(self):
+        return (f"{self.count} ticks, jitter mean {self.mean * 1000:.2f} ms, "
+                f"stdev {self.stdev * 1000:.2f} ms, max {self.max * 1000:.2f} ms")
+
+
+class MotionEngine:
+    def __init__(self, set_angle, servo_configs, rate=50.0, set_angles=None):
+        """set_angle(servo_name, angle) writes one servo; rate is the tick rate in Hz.
+        If given, set_angles({servo_name: angle}) writes a whole tick in one batch"""
+        self.set_angle = set_angle
+        self.set_angles = set_angles
+        self.configs = servo_configs
+        self.period = 1.0 / rate
+        self.current = {name: config.get('rest', 0) for name, config in servo_configs.items()}
+        self.velocity = {name: 0.0 for name in servo_configs}
+        self.jitter = JitterStats()
+        self._deadline = None
+
+    def sync(self, get_angle):
+        """Re-reads the current angles (e.g. after servos were moved directly)"""
+        for servo_name in self.current:
+            angle = get_angle(servo_name)
+            if angle is not None:
+                self.current[servo_name] = angle
+            self.velocity[servo_name] = 0.0
+
+    def _limit(self, servo_name, desired, dt):
+        """Moves one axis toward desired, respecting its velocity/acceleration limits"""
+        config = self.configs[servo_name]
+        max_velocity = config.get('max_velocity')
+        max_accel = config.get('max_accel')
+        current = self.current[servo_name]
+        if max_velocity is None and max_accel is None:
+            self.velocity[servo_name] = (desired - current) / dt
+            return desired
+
+        error = desired - current
+        velocity = error / dt
+        if max_accel is not None:
+            # never go faster than we could still stop from before the target
+            braking = math.sqrt(2 * max_accel * abs(error))
+            velocity = max(-braking, min(velocity, braking))
+            previous = self.velocity[servo_name]
+            velocity = max(previous - max_accel * dt, min(velocity, previous + max_accel * dt))
+        if max_velocity is not None:
+            velocity = max(-max_velocity, min(velocity, max_velocity))
+
+        angle = current + velocity * dt
+        # don't overshoot because of the acceleration clamp
+        if (desired - angle) * error < 0:
+            angle = desired
+            velocity = 0.0
+        self.velocity[servo_name] = velocity
+        return angle
+
+    def step(self, targets, dt=None):
+        """One tick: moves every axis in targets toward its angle and writes the servos"""
+        if dt is None:
+            dt = self.period
+        angles = {}
+        for servo_name, desired in targets.items():
+            angle = self._limit(servo_name, desired, dt)
+            self.current[servo_name] = angle
+            angles[servo_name] = angle
+        if self.set_angles is not None:
+            self.set_angles(angles)
+        else:
+            for servo_name, angle in angles.items():
+                self.set_angle(servo_name, angle)
+
+    def wait_tick(self):
+        """Sleeps until the next tick deadline and records how late it woke up"""
+        now = time.monotonic()
+        if self._deadline is None or now - self._deadline > self.period:
+            # first tick, or we've been idle/behind: restart the schedule
+            self._deadline = now
+        self._deadline += self.period
+        delay = self._deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.jitter.add(max(0.0, time.monotonic() - self._deadline))
+
+    def move(self, targets, duration, easing='ease_in_out'):
+        """Moves all axes in targets together over duration seconds (blocking)"""
+        ease = EASINGS[easing] if isinstance(easing, str) else easing
+        start = {name: self.current[name] for name in targets}
+        start_time = time.monotonic()
+        self._deadline = None
+        while True:
+            self.wait_tick()
+            elapsed = self._deadline - start_time
+            progress = min(1.0, elapsed / duration) if duration > 0 else 1.0
+            p = ease(progress)
+            self.step({name: start[name] + (target - start[name]) * p
+                       for name, target in targets.items()})
+            if progress >= 1.0 and all(abs(self.current[name] - target) < SETTLE_TOLERANCE
+                                       for name, target in targets.items()):
+                break
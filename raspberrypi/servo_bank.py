@@ -0,0 +1,288 @@
+import struct
+from array import array
+from gpiozero import Servo
+import instrument
+import servo_slots
+
+try:
+    import pigpio
+except ImportError:
+    pigpio = None
+
+# One servo layer for servo_run, servo_test, servo_server and ChatterPi's jaw.
+#
+# Every servo has a config dict:
+#   pin      BCM pin
+#   travel   full physical travel in degrees (default 180); the 0.5-2.5 ms
+#            pulse range spans it
+#   center   angle at the middle (1.5 ms) pulse (default 0)
+#   range    (low, high) limits in degrees, angles are clamped to them
+#            (default: the whole travel)
+#
+# Angles are turned into pulse widths (microseconds) through a table built
+# once per servo at TABLE_STEPS per degree. A write is skipped when the pulse
+# is within deadband_us of the last one sent, which is what keeps the jaw's
+# few quantized levels from hitting pigpiod 50 times a second.
+#
+# With a PiGPIOFactory the bank talks to pigpiod directly: set_angles() packs
+# the servo commands for all changed servos into one socket send and reads the
+# replies together, instead of one round-trip per servo through gpiozero (see
+# _pigpio_servos; set_servo_pulsewidth per servo unless pigpio's command
+# socket passes _batch_socket's check when the bank is made). A servo whose
+# command pigpiod refused keeps its last pulse and angle; the refusal is
+# counted (servo_bank.<name>.errors) and returned rather than raised, so a
+# real-time loop carries on with the other servos.
+# Given a servo_slots.Slot instead of a factory, the bank writes the pulse
+# widths into servo_daemon.py's shared memory and the daemon drives the pins.
+# Any other factory (e.g. MockFactory) gets gpiozero Servo objects.
+
+MIN_PULSE_US = 500
+MAX_PULSE_US = 2500
+TABLE_STEPS = 10        # table entries per degree
+
+_PI_CMD_SERVO = 8
+_PI_CMD_PIGPV = 26
+_COMMAND = struct.Struct('<IIII')   # pigpiod socket command / reply
+
+
+def _exchange(sl, commands):
+    """Sends (cmd, p1, p2) commands on pigpio's command socket in one go and
+    returns pigpiod's results, unsigned (>= 2**31 are negative error codes)"""
+    request = b''.join(_COMMAND.pack(cmd, p1, p2, 0) for cmd, p1, p2 in commands)
+    with sl.l:
+        sl.s.sendall(request)
+        replies = b''
+        while len(replies) < len(request):
+            chunk = sl.s.recv(len(request) - len(replies))
+            if not chunk:
+                raise OSError("pigpiod closed the connection")
+            replies += chunk
+    return [_COMMAND.unpack_from(replies, i * _COMMAND.size)[3] for i in range(len(commands))]
+
+
+def _batch_socket(pi):
+    """pigpio's command socket (pi.sl) if batching on it checks out, else None.
+    The socket and its wire format aren't part of pigpio's API, so the check
+    reads pigpiod's version through it and compares it with get_pigpio_version();
+    any other pigpio gets one set_servo_pulsewidth call per servo"""
+    sl = getattr(pi, 'sl', None)
+    if not (hasattr(sl, 's') and hasattr(sl, 'l')):
+        return None
+    try:
+        version = _exchange(sl, [(_PI_CMD_PIGPV, 0, 0)])[0]
+        if version == pi.get_pigpio_version():
+            return sl
+    except (OSError, AttributeError, struct.error, pigpio.error):
+        pass
+    print("servo_bank: pigpio's command socket doesn't check out, writing servos one at a time")
+    return None
+
+
+def _pigpio_servos(pi, sl, writes):
+    """Sends (pin, pulse) servo commands to pigpiod. Returns (errors, round-trips),
+    errors holding None or pigpio's error text per command. With sl (from
+    _batch_socket) the commands go in one round-trip"""
+    if sl is None:
+        errors = []
+        for pin, pulse in writes:
+            try:
+                result = pi.set_servo_pulsewidth(pin, pulse)
+            except pigpio.error as e:
+                errors.append(getattr(e, 'value', str(e)))
+            else:
+                errors.append(pigpio.error_text(result) if result < 0 else None)
+        return errors, len(writes)
+    results = _exchange(sl, [(_PI_CMD_SERVO, pin, pulse) for pin, pulse in writes])
+    return [pigpio.error_text(result - (1 << 32)) if result >= 1 << 31 else None
+            for result in results], 1
+
+
+class _Axis:
+    __slots__ = ('name', 'pin', 'limits', 'pulse', 'angle', 'writes', 'skipped', 'errors',
+                 'last_error', 'write_counter', 'skip_counter', 'error_counter')
+
+    def __init__(self, name, config):
+        self.name = name
+        self.pin = config['pin']
+        self.pulse = None       # last pulse width sent, None when released
+        self.angle = None       # last commanded (clamped) angle
+        self.writes = 0
+        self.skipped = 0
+        self.errors = 0         # writes pigpiod refused
+        self.last_error = None  # pigpio's text for the latest of them
+        self.write_counter = instrument.counter(f'servo_bank.{name}.writes')
+        self.skip_counter = instrument.counter(f'servo_bank.{name}.skipped')
+        self.error_counter = instrument.counter(f'servo_bank.{name}.errors')
+        self.configure(config)
+
+    def configure(self, config):
+        travel = config.get('travel', 180)
+        center = config.get('center', 0)
+        low, high = config.get('range', (center - travel / 2, center + travel / 2))
+        low, high = min(low, high), max(low, high)
+        steps = int(round((high - low) * TABLE_STEPS)) + 1
+        span = MAX_PULSE_US - MIN_PULSE_US
+        mid = (MAX_PULSE_US + MIN_PULSE_US) / 2
+        table = array('H', (int(round(min(MAX_PULSE_US, max(MIN_PULSE_US,
+                                mid + (low + i / TABLE_STEPS - center) / travel * span))))
+                            for i in range(steps)))
+        # one assignment, so a writer never sees new limits with an old table
+        self.limits = (low, high, table)
+
+    def pulse_for(self, angle):
+        """(pulse width in us, clamped angle)"""
+        low, high, table = self.limits
+        angle = low if angle < low else high if angle > high else angle
+        return table[int((angle - low) * TABLE_STEPS + 0.5)], angle
+
+
+class ServoBank:
+    def __init__(self, servo_configs, factory, deadband_us=0):
+        self.deadband_us = deadband_us
+        self.axes = {name: _Axis(name, config) for name, config in servo_configs.items()}
+        self.round_trips = 0
+        self.round_trip_counter = instrument.counter('servo_bank.round_trips')
+        self.pi = None
+        self.batch = None   # pigpio's command socket, when batching works on it
+        self.servos = None
+        self.slot = None
+        connection = getattr(factory, 'connection', None)
+        if isinstance(factory, servo_slots.Slot):
+            # the bank owns the slot it was given
+            try:
+                for axis in self.axes.values():
+                    factory.channel(axis.pin)
+            except ValueError:
+                factory.close()
+                raise
+            self.slot = factory
+        elif pigpio is not None and isinstance(connection, pigpio.pi):
+            # direct pulse widths on gpiozero's own pigpiod connection
+            self.pi = connection
+            self.batch = _batch_socket(connection)
+        else:
+            self.servos = {name: Servo(axis.pin, min_pulse_width=MIN_PULSE_US / 1e6,
+                                       max_pulse_width=MAX_PULSE_US / 1e6, pin_factory=factory)
+                           for name, axis in self.axes.items()}
+
+    def __contains__(self, servo_name):
+        return servo_name in self.axes
+
+    def __iter__(self):
+        return iter(self.axes)
+
+    def configure(self, servo_name, config):
+        """Changes a servo's travel / center / range without touching its pin"""
+        self.axes[servo_name].configure(config)
+
+    def clamp(self, servo_name, angle):
+        low, high, _ = self.axes[servo_name].limits
+        return max(low, min(angle, high))
+
+    def set_angle(self, servo_name, angle):
+        """True unless pigpiod refused the write"""
+        return not self.set_angles({servo_name: angle})
+
+    def set_angles(self, angles):
+        """Writes several servos at once, skipping those inside the deadband.
+        Returns the names of the servos pigpiod refused"""
+        writes = []
+        for servo_name, angle in angles.items():
+            axis = self.axes[servo_name]
+            pulse, clamped = axis.pulse_for(angle)
+            self._queue(axis, pulse, writes, clamped)
+        return self._write(writes) if writes else []
+
+    def set_pulses(self, pulses):
+        """Writes pulse widths in us directly, clamped to each servo's range.
+        Returns the names of the servos pigpiod refused"""
+        writes = []
+        for servo_name, pulse in pulses.items():
+            axis = self.axes[servo_name]
+            low, high, table = axis.limits
+            first, last = table[0], table[-1]
+            if first > last:
+                first, last = last, first
+            self._queue(axis, first if pulse < first else last if pulse > last else pulse, writes)
+        return self._write(writes) if writes else []
+
+    def _queue(self, axis, pulse, writes, angle=None):
+        """angle is the clamped angle behind the pulse, None for set_pulses"""
+        if axis.pulse is not None and abs(pulse - axis.pulse) <= self.deadband_us:
+            axis.skipped += 1
+            axis.skip_counter.inc()
+            if angle is not None:
+                axis.angle = angle
+        else:
+            writes.append((axis, pulse, angle))
+
+    def _write(self, writes):
+        errors = None
+        if self.slot is not None:
+            # no round-trip: the daemon picks it up on its next tick
+            self.slot.write({axis.pin: pulse for axis, pulse, angle in writes})
+            trips = 0
+        elif self.pi is not None:
+            try:
+                errors, trips = _pigpio_servos(self.pi, self.batch,
+                                               [(axis.pin, pulse) for axis, pulse, angle in writes])
+            except OSError:
+                # unknown which commands got through: don't deadband the next write
+                for axis, pulse, angle in writes:
+                    axis.pulse = None
+                raise
+        else:
+            for axis, pulse, angle in writes:
+                self.servos[axis.name].value = ((pulse - MIN_PULSE_US) / (MAX_PULSE_US - MIN_PULSE_US)) * 2 - 1
+            trips = len(writes)
+        self.round_trips += trips
+        self.round_trip_counter.inc(trips)
+        failed = []
+        for i, (axis, pulse, angle) in enumerate(writes):
+            if errors is not None and errors[i] is not None:
+                axis.errors += 1
+                axis.error_counter.inc()
+                axis.last_error = errors[i]
+                failed.append(axis.name)
+                continue
+            axis.pulse = pulse
+            if angle is not None:
+                axis.angle = angle
+            axis.writes += 1
+            axis.write_counter.inc()
+        return failed
+
+    def get_angle(self, servo_name):
+        """Last commanded angle, None if the servo is released"""
+        axis = self.axes[servo_name]
+        return None if axis.pulse is None else axis.angle
+
+    def release(self, servo_names=None):
+        """Stops the pulses (servo goes limp) for the given servos, default all.
+        With a slot the servos are handed back to the daemon, which lets them go
+        limp unless another producer claims them"""
+        axes = [self.axes[servo_name] for servo_name in (self.axes if servo_names is None else servo_names)]
+        if self.slot is not None:
+            self.slot.release([axis.pin for axis in axes])
+        for axis in axes:
+            if self.pi is not None:
+                self.pi.set_servo_pulsewidth(axis.pin, 0)
+            elif self.servos is not None:
+                self.servos[axis.name].value = None
+            axis.pulse = None
+
+    def summary(self):
+        """Writes sent and skipped per servo, and pigpiod round-trips"""
+        parts = [f"{axis.name} {axis.writes} written / {axis.skipped} skipped"
+                 + (f" / {axis.errors} refused ({axis.last_error})" if axis.errors else "")
+                 for axis in self.axes.values()]
+        saved = sum(axis.writes + axis.skipped for axis in self.axes.values()) - self.round_trips
+        return f"{', '.join(parts)}; {self.round_trips} round-trips ({saved} saved)"
+
+    def close(self):
+        self.release()
+        if self.servos is not None:
+            for servo in self.servos.values():
+                servo.close()
+        if self.slot is not None:
+            self.slot.close()
@@ -0,0 +1,45 @@
+import socket
+import time
+import servo_protocol
+
+# Small client for servo_server.py's binary protocol, for the animation tool
+# and test scripts.
+#
+#   client = ServoClient('skull.local')
+#   client.send(Base=10, Pitch=-5, Tilt=3)
+#   client.send_batch([{'Base': 0}, {'Base': 5}, {'Base': 10}])
+
+
+class ServoClient:
+    def __init__(self, host='127.0.0.1', port=8888, seq=0):
+        self.address = (host, port)
+        self.seq = seq
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _frame(self, angles, timestamp=None):
+        if timestamp is None:
+            timestamp = time.monotonic()
+        self.seq = (self.seq + 1) % servo_protocol.SEQ_MOD
+        return servo_protocol.encode(self.seq, angles, timestamp)
+
+    def send(self, timestamp=None, **angles):
+        """Sends one frame with the given axes, e.g. send(Base=10, Tilt=-3)"""
+        self.sock.sendto(self._frame(angles, timestamp), self.address)
+
+    def send_batch(self, frames, timestamp=None):
+        """Sends several frames (dicts of servo name -> angle) in one datagram"""
+        data = b''.join(self._frame(angles, timestamp) for angles in frames)
+        self.sock.sendto(data, self.address)
+
+    def send_text(self, command):
+        """Sends an old-style text command like "B10 P-5 T3" """
+        self.sock.sendto(command.encode('utf-8'), self.address)
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
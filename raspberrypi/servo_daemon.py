@@ -0,0 +1,134 @@
+from gpiozero.pins.pigpio import PiGPIOFactory
+import argparse
+import signal
+import sys
+import time
+import instrument
+import servo_slots
+from motion import JitterStats
+from servo_bank import ServoBank
+
+# The one process that drives the servo pins. servo_server.py, servo_run.py,
+# servo_test.py, servo_hold/reset/stop.py and ChatterPi's jaw find it running
+# and write their targets into shared-memory slots instead of opening the pins
+# themselves (see servo_slots.py). Every tick the daemon merges the slots by
+# priority and writes all changed pins in one batch, so head and jaw move on
+# the same clock:
+#
+#   python3 servo_daemon.py --rate 100
+#
+# Producers keep their own angle conventions and send pulse widths; the
+# channels below only set the safety limits, in the servo_bank.py format
+# (default: the whole 0.5-2.5 ms range).
+CHANNELS = {
+    'Base':  {'pin': 23},
+    'Pitch': {'pin': 24},
+    'Tilt':  {'pin': 25},
+    'Mouth': {'pin': 18},
+}
+
+# Writes that would move a servo by this many microseconds or less are skipped
+DEADBAND_US = 1
+# servo_server.py answers on instrument.DEFAULT_PORT, ChatterPi on 8898
+STATS_PORT = 8897
+# How often slots of producers that died without closing them are freed
+REAP_EVERY = 1.0
+
+# see instrument.py
+TICK_TIME = instrument.ring('daemon.tick')
+SLOT_LATENCY = instrument.ring('daemon.slot_to_pwm')
+MISSED_TICKS = instrument.counter('daemon.missed_ticks')
+
+
+def apply_claims(table, bank, names, applied):
+    """Writes the winning claim of every channel that changed since applied (the
+    previous result); unclaimed channels go limp. Returns the claims that were
+    written"""
+    claims = table.claims()
+    refused = bank.set_pulses({names[channel]: pulse for channel, pulse in claims.items()
+                               if pulse is not None and applied.get(channel) != pulse})
+    limp = [name for channel, name in enumerate(names)
+            if claims.get(channel) is None and bank.axes[name].pulse is not None]
+    if limp:
+        bank.release(limp)
+    # pigpiod refused these (counted by the bank): tried again next tick
+    for channel, name in enumerate(names):
+        if name in refused:
+            claims.pop(channel, None)
+    return claims
+
+
+def run(table, bank, rate, report_every=10.0):
+    """The tick loop: reads the slots on monotonic deadlines and applies any change"""
+    names = list(bank)
+    applied = {}
+    period = 1.0 / rate
+    jitter = JitterStats()
+    deadline = time.monotonic()
+    next_reap = deadline + REAP_EVERY
+    next_report = deadline + report_every
+    retry = False   # a write pigpiod refused is tried again on the next tick
+    while True:
+        deadline += period
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        elif -delay > period:
+            # Fell more than a tick behind: skip ahead rather than bursting
+            MISSED_TICKS.inc(int(-delay / period))
+            deadline = time.monotonic()
+        started = time.monotonic()
+        jitter.add(max(0.0, started - deadline))
+
+        changed = table.read()
+        if started >= next_reap:
+            next_reap += REAP_EVERY
+            if table.reap():
+                changed.append(None)
+        if changed or retry:
+            applied = apply_claims(table, bank, names, applied)
+            retry = len(applied) < len(table.claims())
+            written = time.monotonic()
+            for body in changed:
+                if body is not None:
+                    SLOT_LATENCY.push(written - body[3])
+        table.tick()
+        TICK_TIME.push(time.monotonic() - started)
+
+        if started >= next_report:
+            next_report += report_every
+            owners = ', '.join(f"{name} ({priority})" for name, priority, pid in table.owners())
+            print(f"{jitter.summary()}; producers: {owners or 'none'}")
+            jitter.reset()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servo daemon: owns the servo pins and "
+                                                 "merges producers' shared-memory slots by priority")
+    parser.add_argument('--rate', type=float, default=100.0,
+                        help="tick rate in Hz (default 100)")
+    parser.add_argument('--stats-port', type=int, default=STATS_PORT,
+                        help="localhost UDP port answering with JSON stats, 0 to disable "
+                             f"(default {STATS_PORT}; query with instrument.py {STATS_PORT})")
+    parser.add_argument('--stats-every', type=float, default=60.0,
+                        help="seconds between stats summaries in the log, 0 to disable (default 60)")
+    args = parser.parse_args()
+
+    # Use PiGPIO for hardware PWM (smoother servo control)
+    bank = ServoBank(CHANNELS, PiGPIOFactory(), deadband_us=DEADBAND_US)
+    table = servo_slots.SlotTable([config['pin'] for config in CHANNELS.values()], args.rate)
+    # systemd / kill stop the daemon like Ctrl+C, so the pins are released
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    if args.stats_port:
+        instrument.start_server(args.stats_port)
+    if args.stats_every:
+        instrument.start_reporter(args.stats_every)
+    print(f"Servo daemon ready ({args.rate:g} Hz, slots in {table.path})")
+    try:
+        run(table, bank, args.rate)
+    except KeyboardInterrupt:
+        print("Stopping...")
+    finally:
+        table.close()
+        print(bank.summary())
+        bank.close()
@@ -1,28 +1,51 @@
 from gpiozero import Servo
 from time import sleep
+import servo_slots
 
-servo1 = Servo(23)  # Base
-servo2 = Servo(24)  # Pitch
-servo3 = Servo(25)  # Tilt
-servo4 = Servo(18)  # Mouth
+PINS = (23, 24, 25, 18) # Base, Pitch, Tilt, Mouth
+MID_PULSE_US = 1500
 
 try:
-    # Move all servos to middle position
-    servo1.mid()
-    servo2.mid()
-    servo3.mid()
-    servo4.mid()
-
-    print("Servos holding position. Press CTRL+C to stop.")
-    while True:
-        # Just sleep in a loop so they keep holding
-        sleep(1)
-
-except KeyboardInterrupt:
-    print("\nServo stopped")
-    # detach when exiting to release motors
-    servo1.detach()
-    servo2.detach()
-    servo3.detach()
-    servo4.detach()
+    # servo_daemon.py owns the pins: hold them through it, over everyone else
+    slot = servo_slots.Slot('test')
+except servo_slots.DaemonNotRunning:
+    slot = None
 
+if slot is not None:
+    try:
+        slot.write({pin: MID_PULSE_US for pin in PINS})
+
+        print("Servos holding position. Press CTRL+C to stop.")
+        while True:
+            sleep(1)
+
+    except KeyboardInterrupt:
+        print("\nServo stopped")
+        # hands the servos back to the daemon
+        slot.close()
+
+else:
+    servo1 = Servo(23)  # Base
+    servo2 = Servo(24)  # Pitch
+    servo3 = Servo(25)  # Tilt
+    servo4 = Servo(18)  # Mouth
+
+    try:
+        # Move all servos to middle position
+        servo1.mid()
+        servo2.mid()
+        servo3.mid()
+        servo4.mid()
+
+        print("Servos holding position. Press CTRL+C to stop.")
+        while True:
+            # Just sleep in a loop so they keep holding
+            sleep(1)
+
+    except KeyboardInterrupt:
+        print("\nServo stopped")
+        # detach when exiting to release motors
+        servo1.detach()
+        servo2.detach()
+        servo3.detach()
+        servo4.detach()
@@ -0,0 +1,138 @@
+import struct
+import time
+
+# Binary command frame for servo_server.py (sent alongside the old text format)
+#
+# Every frame is 32 bytes, little endian:
+#   magic     2s  b'SK'
+#   version   B   PROTOCOL_VERSION
+#   mask      B   bit 0 = Base, 1 = Pitch, 2 = Tilt, 3 = Mouth
+#   seq       I   sequence number, incremented by the sender for every frame
+#   timestamp d   sender's time.monotonic() when the frame was built
+#   angles    4f  Base, Pitch, Tilt, Mouth in degrees (ignored unless in mask)
+#
+# A datagram may carry several frames back to back (a batch); they are applied
+# in order. Text commands like "B10 P-5 T3" never start with the magic, so both
+# formats can share the same port.
+MAGIC = b'SK'
+PROTOCOL_VERSION = 1
+FRAME = struct.Struct('<2sBBId4f')
+
+AXES = ('Base', 'Pitch', 'Tilt', 'Mouth')
+AXIS_BITS = {name: 1 << i for i, name in enumerate(AXES)}
+TEXT_AXES = {'B': 'Base', 'P': 'Pitch', 'T': 'Tilt', 'M': 'Mouth'}
+
+SEQ_MOD = 1 << 32
+# A frame this far behind the newest one is treated as a sender restart
+SEQ_RESTART_GAP = 1000
+# Senders not heard from for this many seconds are forgotten, so a server
+# seeing many short-lived client ports doesn't keep them all
+SENDER_TIMEOUT = 60.0
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+class Frame:
+    __slots__ = ('seq', 'timestamp', 'mask', 'values')
+
+    def __init__(self, seq, timestamp, mask, values):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.mask = mask
+        self.values = values
+
+    def angles(self):
+        """Yields (servo_name, angle) for every axis present in the frame"""
+        for i, name in enumerate(AXES):
+            if self.mask & (1 << i):
+                yield name, self.values[i]
+
+
+def is_binary(data):
+    return data[:2] == MAGIC
+
+
+def encode(seq, angles, timestamp=0.0):
+    """Packs a frame. angles is a dict of servo name -> angle in degrees"""
+    mask = 0
+    values = [0.0] * len(AXES)
+    for name, angle in angles.items():
+        mask |= AXIS_BITS[name]
+        values[AXES.index(name)] = angle
+    return FRAME.pack(MAGIC, PROTOCOL_VERSION, mask, seq % SEQ_MOD, timestamp, *values)
+
+
+def decode(data):
+    """Unpacks a datagram into a list of Frames"""
+    if len(data) == 0 or len(data) % FRAME.size:
+        raise ProtocolError(f"bad datagram length {len(data)}")
+    frames = []
+    for magic, version, mask, seq, timestamp, *values in FRAME.iter_unpack(data):
+        if magic != MAGIC:
+            raise ProtocolError("bad magic")
+        if version != PROTOCOL_VERSION:
+            raise ProtocolError(f"unsupported protocol version {version}")
+        frames.append(Frame(seq, timestamp, mask, values))
+    return frames
+
+
+def parse_text(command):
+    """Parses a text command like "B10 P-5 T3" into (servo_name, angle) pairs"""
+    angles = []
+    for part in command.split():
+        name = TEXT_AXES.get(part[:1])
+        if name is None:
+            continue
+        try:
+            angles.append((name, float(part[1:])))
+        except ValueError:
+            raise ProtocolError(f"bad token {part!r}")
+    return angles
+
+
+def commands(data, sender=None, sequence_filter=None):
+    """Returns the (servo_name, angle) commands carried by one datagram, in order.
+    Binary frames rejected by sequence_filter are skipped"""
+    if is_binary(data):
+        result = []
+        for frame in decode(data):
+            if sequence_filter is None or sequence_filter.accept(sender, frame.seq):
+                result.extend(frame.angles())
+        return result
+    return parse_text(data.decode('utf-8'))
+
+
+class SequenceFilter:
+    """Drops out-of-order and stale frames, per sender address"""
+
+    def __init__(self, timeout=SENDER_TIMEOUT):
+        self.timeout = timeout
+        self.last_seq = {}      # sender -> (last seq, time.monotonic() it came in)
+        self.dropped = 0
+        self.next_prune = time.monotonic() + timeout
+
+    def accept(self, sender, seq, now=None):
+        if now is None:
+            now = time.monotonic()
+        if now >= self.next_prune:
+            self.prune(now)
+        last = self.last_seq.get(sender)
+        if last is not None:
+            behind = (last[0] - seq) % SEQ_MOD
+            # behind == 0 is a duplicate; small positive values are stale
+            if behind < SEQ_RESTART_GAP:
+                self.dropped += 1
+                return False
+        self.last_seq[sender] = (seq, now)
+        return True
+
+    def prune(self, now=None):
+        """Forgets the senders idle for longer than the timeout"""
+        if now is None:
+            now = time.monotonic()
+        self.next_prune = now + self.timeout
+        for sender, (seq, seen) in list(self.last_seq.items()):
+            if now - seen > self.timeout:
+                del self.last_seq[sender]
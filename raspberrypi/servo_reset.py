@@ -1,25 +1,46 @@
 from gpiozero import Servo
 from time import sleep
+import servo_slots
 
-servo1 = Servo(23) # Base
-servo2 = Servo(24) # Pitch
-servo3 = Servo(25) # Tilt
-servo4 = Servo(18) # Mouth
+PINS = (23, 24, 25, 18) # Base, Pitch, Tilt, Mouth
+MID_PULSE_US = 1500
 
 try:
-    servo1.mid()
-    servo2.mid()
-    servo3.mid()
-    servo4.mid()
-    # disconnect
-    sleep(1)
-    servo1.detach()
-    servo2.detach()
-    servo3.detach()
-    servo4.detach()
-except KeyboardInterrupt:
-    print("servo stopped")
-    servo1.detach()
-    servo2.detach()
-    servo3.detach()
-    servo4.detach()
+    # servo_daemon.py owns the pins: reset them through it
+    slot = servo_slots.Slot('test')
+except servo_slots.DaemonNotRunning:
+    slot = None
+
+if slot is not None:
+    try:
+        slot.write({pin: MID_PULSE_US for pin in PINS})
+        sleep(1)
+    except KeyboardInterrupt:
+        print("servo stopped")
+    finally:
+        # hands the servos back to the daemon (limp unless another producer has them)
+        slot.close()
+
+else:
+    servo1 = Servo(23) # Base
+    servo2 = Servo(24) # Pitch
+    servo3 = Servo(25) # Tilt
+    servo4 = Servo(18) # Mouth
+
+    try:
+        servo1.mid()
+        servo2.mid()
+        servo3.mid()
+        servo4.mid()
+        # disconnect
+        sleep(1)
+        servo1.detach()
+        servo2.detach()
+        servo3.detach()
+        servo4.detach()
+    except KeyboardInterrupt:
+        print("servo stopped")
+        servo1.detach()
+        servo2.detach()
+        servo3.detach()
+        servo4.detach()
@@ -1,57 +1,39 @@
 import random
 import time
-from gpiozero import Servo
-from gpiozero.pins.pigpio import PiGPIOFactory
+from motion import MotionEngine
+from servo_bank import ServoBank
+import servo_slots
 
-# Use PiGPIO for hardware PWM (smoother servo control)
-factory = PiGPIOFactory()
+# Through servo_daemon.py when it's running, otherwise PiGPIO for hardware PWM
+factory = servo_slots.slot_or_factory('idle')
 
 # Servo configurations
 # travel: full physical servo range in degrees (e.g., 190 degrees)
 # range: the artificial limits you want to use within that travel (e.g., -34 to 34)
+# max_velocity / max_accel: motion limits in degrees/s and degrees/s^2 (see motion.py)
 servo_configs = {
-    'Base':  {'pin': 23, 'travel': 190, 'range': (-36, 36), 'rest': 0},
-    'Pitch': {'pin': 24, 'travel': 190, 'range': (-24, 19), 'rest': -0.13},
-    'Tilt':  {'pin': 25, 'travel': 190, 'range': (-19, 19), 'rest': 0},
+    'Base':  {'pin': 23, 'travel': 190, 'range': (-36, 36), 'rest': 0,
+              'max_velocity': 120, 'max_accel': 400},
+    'Pitch': {'pin': 24, 'travel': 190, 'range': (-24, 19), 'rest': -0.13,
+              'max_velocity': 90, 'max_accel': 300},
+    'Tilt':  {'pin': 25, 'travel': 190, 'range': (-19, 19), 'rest': 0,
+              'max_velocity': 90, 'max_accel': 300},
 }
 
-# Create Servo objects
-servos = {}
-for name, config in servo_configs.items():
-    servos[name] = Servo(config['pin'], min_pulse_width=0.5/1000, max_pulse_width=2.5/1000, pin_factory=factory)
+# Writes that would move a servo by this many microseconds or less are skipped
+DEADBAND_US = 1
+
+# Angle -> pulse tables, deadband and batched pigpio writes (see servo_bank.py)
+bank = ServoBank(servo_configs, factory, deadband_us=DEADBAND_US)
 
 def set_servo_angle(servo_name, angle):
-    config = servo_configs[servo_name]
-    travel = config['travel']
-    min_angle, max_angle = config['range']
-    
-    # Calculate the physical range
-    max_physical = travel / 2
-    
-    # Clamp the angle to the defined limits
-    clamped_angle = max(min_angle, min(angle, max_angle))
-    
-    # Convert angle to servo value: map directly to physical position
-    value = clamped_angle / max_physical
-    
-    servos[servo_name].value = value
+    bank.set_angle(servo_name, angle)
+
+def set_servo_angles(angles):
+    bank.set_angles(angles)
 
 def get_current_angle(servo_name):
-    servo = servos[servo_name]
-    if servo.value is None:
-        return None
-    
-    config = servo_configs[servo_name]
-    travel = config['travel']
-    
-    # Calculate the physical range (same as in set_servo_angle)
-    max_physical = travel / 2
-    
-    # Convert servo value back to angle (inverse of set_servo_angle)
-    # servo_val -> angle: value = angle / max_physical, so angle = value * max_physical
-    angle = servo.value * max_physical
-    
-    return angle
+    return bank.get_angle(servo_name)
 
 def reset_servo(servo_name):
     rest_position = servo_configs[servo_name]['rest']
@@ -59,29 +41,24 @@ def reset_servo(servo_name):
     time.sleep(0.5)
 
 def reset_all_servos():
-    for servo_name in servos:
+    for servo_name in bank:
         reset_servo(servo_name)
 
 def deactivate_all_servos():
-    for servo in servos.values():
-        servo.value = None
+    bank.release()
 
 def activate_all_servos():
-    for name in servos.keys():
-        set_servo_angle(name, servo_configs[name]['rest'])
+    bank.set_angles({name: servo_configs[name]['rest'] for name in bank})
+
+# All axes move together on one 50Hz scheduler
+engine = MotionEngine(set_servo_angle, servo_configs, rate=50, set_angles=set_servo_angles)
+
+def move_to_angles(targets, duration, easing='ease_in_out'):
+    engine.sync(get_current_angle)
+    engine.move(targets, duration, easing)
 
 def move_to_angle(servo_name, target_angle, duration):
-    start_angle = get_current_angle(servo_name)
-    if start_angle is None:
-        start_angle = servo_configs[servo_name]['rest']
-    
-    start_time = time.time()
-    while time.time() - start_time < duration:
-        elapsed = time.time() - start_time
-        progress = elapsed / duration
-        current_angle = start_angle + (target_angle - start_angle) * progress
-        set_servo_angle(servo_name, current_angle)
-        time.sleep(0.02)  # 50Hz update rate
+    move_to_angles({servo_name: target_angle}, duration)
 
 def random_head_movement(duration):
     config = servo_configs
@@ -91,9 +68,7 @@ def random_head_movement(duration):
     
     print(f"Moving to - Base: {base_angle:.1f}°, Pitch: {pitch_angle:.1f}°, Tilt: {tilt_angle:.1f}°")
     
-    move_to_angle('Base', base_angle, duration)
-    move_to_angle('Pitch', pitch_angle, duration)
-    move_to_angle('Tilt', tilt_angle, duration)
+    move_to_angles({'Base': base_angle, 'Pitch': pitch_angle, 'Tilt': tilt_angle}, duration)
 
 def demo_animation():
     print("Starting demo animation. Press Ctrl+C to stop.")
@@ -110,6 +85,9 @@ def demo_animation():
                 
                 time.sleep(0.1)  # Small pause between movements
             
+            print(f"Motion timing: {engine.jitter.summary()}")
+            engine.jitter.reset()
+            
             # Reset to rest positions
             reset_all_servos()
             
@@ -137,5 +115,4 @@ if __name__ == "__main__":
         activate_all_servos()  # Ensure servos are active before final reset
         reset_all_servos()  # Ensure all servos return to rest position
         deactivate_all_servos()  # Deactivate all servos before exiting
-        for servo in servos.values():
-            servo.close()
+        bank.close()
@@ -1,30 +1,56 @@
-from gpiozero import Servo
-from gpiozero.pins.pigpio import PiGPIOFactory
+import argparse
+import asyncio
 import socket
-from time import sleep
+import time
+import instrument
+import motion
+import servo_protocol
+import servo_slots
+import udp_log
+from servo_bank import ServoBank
 
-# Use PiGPIO for hardware PWM (smoother servo control)
-factory = PiGPIOFactory()
+# Through servo_daemon.py when it's running, otherwise PiGPIO for hardware PWM
+factory = servo_slots.slot_or_factory('udp')
 
 # Servo configurations with angle limits
+# travel / center map angles to pulse widths (see servo_bank.py)
+# max_velocity / max_accel are only used by --smooth (see motion.py)
 servo_configs = {
-    'Base':  {'pin': 23, 'range': (-90, 90)},
-    'Pitch': {'pin': 24, 'range': (-45, 45)},
-    'Tilt':  {'pin': 25, 'range': (-45, 45)},
-    'Mouth': {'pin': 18, 'range': (45, 80)}  # Angle range for mouth
+    'Base':  {'pin': 23, 'travel': 180, 'range': (-90, 90), 'max_velocity': 180, 'max_accel': 600},
+    'Pitch': {'pin': 24, 'travel': 90, 'range': (-45, 45), 'max_velocity': 120, 'max_accel': 400},
+    'Tilt':  {'pin': 25, 'travel': 90, 'range': (-45, 45), 'max_velocity': 120, 'max_accel': 400},
+    'Mouth': {'pin': 18, 'travel': 90, 'center': 45, 'range': (45, 80)}  # Angle range for mouth
 }
 
-# Set this to False to disable the Mouth servo (so ChatterPi can use GPIO 18)
+# Set this to False to disable the Mouth servo (so ChatterPi can use GPIO 18).
+# With servo_daemon.py running the daemon shares GPIO 18 (ChatterPi's jaw has
+# the higher priority), so the Mouth servo is always used
 use_mouth_servo = False
 
-# Create Servo objects
-servos = {}
+# Writes that would move a servo by this many microseconds or less are skipped
+DEADBAND_US = 1
+
+active_configs = {}
 for name, config in servo_configs.items():
     # Skip creating the Mouth servo if it's disabled
-    if name == 'Mouth' and not use_mouth_servo:
+    if name == 'Mouth' and not use_mouth_servo and not isinstance(factory, servo_slots.Slot):
         print("Mouth servo is disabled - GPIO 18 is available for ChatterPi")
         continue
-    servos[name] = Servo(config['pin'], min_pulse_width=0.5/1000, max_pulse_width=2.5/1000, pin_factory=factory)
+    active_configs[name] = config
+bank = ServoBank(active_configs, factory, deadband_us=DEADBAND_US)
+
+# see instrument.py
+PACKETS = instrument.counter('udp.packets')
+BAD_PACKETS = instrument.counter('udp.bad')
+WRITES = instrument.counter('servo.writes')
+WRITE_TIME = instrument.ring('servo.write')
+MISSED_TICKS = instrument.counter('servo.missed_ticks')
+OUT_OF_ORDER = instrument.counter('udp.out_of_order')
+COALESCED = instrument.counter('udp.coalesced')
+RECEIVE_TO_APPLY = instrument.ring('udp.receive_to_apply')
+
+# --capture: every datagram received is logged here (see udp_log.py)
+capture = None
 
 # Set up UDP socket
 udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -32,55 +58,188 @@ udp_socket.bind(('0.0.0.0', 8888))
 
 def set_servo_angle(servo_name, angle):
     # Check if mouth servo is disabled
-    if servo_name == 'Mouth' and not use_mouth_servo:
+    if servo_name not in bank:
         print("Mouth servo is disabled - ignoring command")
         return
     
-    config = servo_configs[servo_name]
-    min_angle, max_angle = config['range']
-    
-    # Clamp the angle to the defined limits
-    clamped_angle = max(min_angle, min(angle, max_angle))
-    
-    # Convert the clamped angle to gpiozero's -1 to 1 range
-    if servo_name == 'Mouth':
-        # Mouth uses 0 to 90 range
-        value = (clamped_angle / 90) * 2 - 1
-    else:
-        # Other servos use -45 to 45 (or -90 to 90) range
-        value = clamped_angle / max_angle
-    
-    servos[servo_name].value = value
+    started = time.perf_counter()
+    written = bank.set_angle(servo_name, angle)
+    WRITE_TIME.push(time.perf_counter() - started)
+    if written:
+        # pigpiod refusals are counted by the bank instead
+        WRITES.inc()
     
+    clamped_angle = bank.clamp(servo_name, angle)
     if clamped_angle != angle:
         print(f"Warning: {servo_name} angle clamped from {angle} to {clamped_angle}")
 
-try:
+# Drops out-of-order and repeated binary frames
+sequence_filter = servo_protocol.SequenceFilter()
+
+def parse_datagram(data, addr):
+    """Returns the (servo_name, angle) commands carried by one datagram, in order"""
+    # Binary frames (see servo_protocol.py) or text commands like "B10 P-5 T3"
+    dropped = sequence_filter.dropped
+    try:
+        return servo_protocol.commands(data, addr, sequence_filter)
+    finally:
+        if sequence_filter.dropped != dropped:
+            OUT_OF_ORDER.inc(sequence_filter.dropped - dropped)
+
+def run_blocking():
+    """Original mode: every command is written to the servo as soon as it arrives"""
     print("Servo control ready. Waiting for commands...")
     while True:
-        data, addr = udp_socket.recvfrom(1024)
-        command = data.decode('utf-8')
-        print(f"Received: {command}")
-        
-        # Parse command
-        parts = command.split()
-        for part in parts:
-            if part.startswith('B'):
-                set_servo_angle('Base', int(part[1:]))
-            elif part.startswith('P'):
-                set_servo_angle('Pitch', int(part[1:]))
-            elif part.startswith('T'):
-                set_servo_angle('Tilt', int(part[1:]))
-            elif part.startswith('M'):
-                set_servo_angle('Mouth', int(part[1:]))
-        
-        # Small delay to allow servos to move
-        sleep(0.01)
-
-except KeyboardInterrupt:
-    print("Stopping...")
-finally:
-    # Clean up
-    for servo in servos.values():
-        servo.close()
-    udp_socket.close()
+        data, addr = udp_socket.recvfrom(4096)
+        received = time.monotonic()
+        PACKETS.inc()
+        if capture is not None:
+            capture.add(data, addr, received)
+        try:
+            for servo_name, angle in parse_datagram(data, addr):
+                set_servo_angle(servo_name, angle)
+                RECEIVE_TO_APPLY.push(time.monotonic() - received)
+        except (servo_protocol.ProtocolError, UnicodeDecodeError) as e:
+            BAD_PACKETS.inc()
+            print(f"Ignoring bad packet from {addr[0]}: {e}")
+
+class LatestTargets(asyncio.DatagramProtocol):
+    """Keeps only the newest target per axis; the output tick applies them"""
+
+    def __init__(self):
+        self.targets = {}   # servo_name -> (angle, receive time)
+        self.packets = 0
+        self.coalesced = 0  # targets overwritten before the tick applied them
+        self.bad = 0
+
+    def datagram_received(self, data, addr):
+        now = time.monotonic()
+        self.packets += 1
+        PACKETS.inc()
+        if capture is not None:
+            capture.add(data, addr, now)
+        try:
+            commands = parse_datagram(data, addr)
+        except (servo_protocol.ProtocolError, UnicodeDecodeError):
+            self.bad += 1
+            BAD_PACKETS.inc()
+            return
+        for servo_name, angle in commands:
+            if servo_name in self.targets:
+                self.coalesced += 1
+                COALESCED.inc()
+            self.targets[servo_name] = (angle, now)
+
+    def take(self):
+        targets, self.targets = self.targets, {}
+        return targets
+
+async def output_tick(receiver, rate, engine=None, report_every=10.0):
+    """Applies the latest targets at a fixed rate on monotonic deadlines.
+    With an engine, axes glide toward their targets within the motion limits"""
+    period = 1.0 / rate
+    goals = {}
+    ticks = missed = writes = 0
+    latency_sum = latency_max = 0.0
+    deadline = time.monotonic()
+    next_report = deadline + report_every
+    while True:
+        deadline += period
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        elif -delay > period:
+            # Fell more than a tick behind: skip ahead rather than bursting
+            missed += int(-delay / period)
+            MISSED_TICKS.inc(int(-delay / period))
+            deadline = time.monotonic()
+        ticks += 1
+        received_targets = receiver.take()
+        # only the targets of the bank's axes count as applied in the stats
+        applied = {servo_name: target for servo_name, target in received_targets.items()
+                   if servo_name in bank}
+        if engine is None:
+            for servo_name, (angle, received) in received_targets.items():
+                set_servo_angle(servo_name, angle)
+        else:
+            # Smoothed: keep stepping toward the goals within the motion limits
+            for servo_name, (angle, received) in received_targets.items():
+                # same check as set_servo_angle: the engine only drives the bank's axes
+                if servo_name not in applied:
+                    print(f"{servo_name} servo is disabled - ignoring command")
+                    continue
+                goals[servo_name] = angle
+            engine.step({name: goal for name, goal in goals.items()
+                         if abs(engine.current[name] - goal) > motion.SETTLE_TOLERANCE
+                         or engine.velocity[name]})
+        for servo_name, (angle, received) in applied.items():
+            latency = time.monotonic() - received
+            RECEIVE_TO_APPLY.push(latency)
+            latency_sum += latency
+            latency_max = max(latency_max, latency)
+            writes += 1
+        if deadline >= next_report:
+            next_report += report_every
+            avg_ms = latency_sum / writes * 1000 if writes else 0.0
+            print(f"{ticks} ticks ({missed} missed), {receiver.packets} packets, "
+                  f"{writes} writes, {receiver.coalesced} coalesced, "
+                  f"{sequence_filter.dropped} out of order, {receiver.bad} bad, "
+                  f"latency avg {avg_ms:.1f} ms max {latency_max * 1000:.1f} ms")
+            latency_sum = latency_max = 0.0
+            writes = 0
+
+async def serve_latest(rate, smooth=False):
+    loop = asyncio.get_running_loop()
+    udp_socket.setblocking(False)
+    transport, receiver = await loop.create_datagram_endpoint(LatestTargets, sock=udp_socket)
+    engine = None
+    if smooth:
+        engine = motion.MotionEngine(set_servo_angle, active_configs, rate)
+    print(f"Servo control ready (latest value wins, {rate:g} Hz). Waiting for commands...")
+    try:
+        await output_tick(receiver, rate, engine)
+    finally:
+        transport.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="UDP servo command server")
+    parser.add_argument('--latest', action='store_true',
+                        help="asyncio mode: keep only the newest target per axis and apply it on a fixed tick")
+    parser.add_argument('--rate', type=float, default=50.0,
+                        help="output tick rate in Hz for --latest (default 50)")
+    parser.add_argument('--smooth', action='store_true',
+                        help="with --latest, glide to targets within each axis' max_velocity/max_accel")
+    parser.add_argument('--stats-port', type=int, default=instrument.DEFAULT_PORT,
+                        help="localhost UDP port answering with JSON stats, 0 to disable "
+                             f"(default {instrument.DEFAULT_PORT}; query with instrument.py)")
+    parser.add_argument('--stats-every', type=float, default=60.0,
+                        help="seconds between stats summaries in the log, 0 to disable (default 60)")
+    parser.add_argument('--capture', metavar='LOG', default=None,
+                        help="log every received datagram to LOG for udp_log.py replay")
+    args = parser.parse_args()
+    if args.capture:
+        try:
+            capture = udp_log.LogWriter(args.capture)
+        except FileExistsError:
+            bank.close()
+            parser.error(f"{args.capture} already exists, capture to a new file")
+        print(f"Capturing received datagrams to {args.capture}")
+    if args.stats_port:
+        instrument.start_server(args.stats_port)
+    if args.stats_every:
+        instrument.start_reporter(args.stats_every)
+    try:
+        if args.latest:
+            asyncio.run(serve_latest(args.rate, args.smooth))
+        else:
+            run_blocking()
+    except KeyboardInterrupt:
+        print("Stopping...")
+    finally:
+        # Clean up
+        print(bank.summary())
+        bank.close()
+        udp_socket.close()
+        if capture is not None:
+            capture.close()
+            print(f"Captured {capture.count} datagrams to {args.capture}")
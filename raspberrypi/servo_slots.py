@@ -0,0 +1,373 @@
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+# Shared-memory command slots between servo_daemon.py and its producers
+# (servo_server, servo_run, servo_test, servo_hold/reset/stop, ChatterPi's jaw).
+#
+# The daemon owns every servo pin. Each producer claims one slot and writes
+# pulse widths (microseconds) for the pins it wants into it; the daemon reads
+# all slots on its tick and, per pin, applies the claim of the highest priority
+# slot (the newest one on a tie). A pin nobody claims goes limp.
+#
+# The table is a file in /dev/shm, mmapped by every process:
+#   header  magic, version, channel count, slot count, daemon pid, tick rate,
+#           the pin of each channel, then a tick counter
+#   slots   MAX_SLOTS x SLOT_SIZE, each written by one producer only
+#
+# A slot is a seqlock: the producer makes its sequence number odd, writes the
+# body, then makes it even again. The daemon reads the sequence, the body and
+# the sequence again, and keeps its previous copy if the two differ or the
+# first was odd. Nobody takes a lock to write targets; the lock file is only
+# used to claim and free slots.
+#
+# The table outlives the daemon: a stopping daemon only zeroes the pid in the
+# header and the next one reuses the file, slots and all, so producers keep
+# their claims across a restart. A producer notices a new daemon pid (or, every
+# CHECK_EVERY seconds, a table file that was replaced) when it writes, and
+# follows it.
+
+SHM_PATH = os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+                        'skellxyz_servo')
+MAGIC = b'SKSV'
+VERSION = 1
+MAX_CHANNELS = 8
+MAX_SLOTS = 8
+
+# Default priority per producer name; higher wins a pin
+PRIORITY = {
+    'idle': 10,     # servo_run.py's head movements
+    'udp': 20,      # servo_server.py
+    'jaw': 30,      # ChatterPi
+    'test': 40,     # servo_test.py, servo_hold.py, servo_reset.py, servo_stop.py
+}
+
+HEADER = struct.Struct(f'<4sBBBxId{MAX_CHANNELS}B')
+PID = struct.Struct('<I')
+PID_OFFSET = 8
+TICKS = struct.Struct('<Q')
+TICKS_OFFSET = 32
+HEADER_SIZE = 40
+
+SEQ = struct.Struct('<I')
+# pid, priority, name, timestamp, claimed mask, limp mask, pulse per channel
+BODY = struct.Struct(f'<Ii16sdII{MAX_CHANNELS}H')
+BODY_OFFSET = 8
+SLOT_SIZE = 64
+
+SIZE = HEADER_SIZE + MAX_SLOTS * SLOT_SIZE
+
+# seconds between a producer's checks that its table file is still the current one
+CHECK_EVERY = 1.0
+
+
+class DaemonNotRunning(OSError):
+    pass
+
+
+def pid_alive(pid):
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _open(path, flags):
+    fd = os.open(path, flags, 0o666)
+    try:
+        if flags & os.O_CREAT:
+            os.ftruncate(fd, SIZE)
+        return fd, mmap.mmap(fd, SIZE)
+    except OSError:
+        os.close(fd)
+        raise
+
+
+class _Locked:
+    """Holds the table's lock file while slots are claimed or freed"""
+
+    def __init__(self, path):
+        self.path = path + '.lock'
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        os.close(self.fd)
+
+
+class Slot:
+    """A producer's slot: write() claims pins with pulse widths, release() gives them back"""
+
+    def __init__(self, name, priority=None, path=SHM_PATH):
+        self.name = name
+        self.priority = PRIORITY[name] if priority is None else priority
+        self.path = path
+        self.pid = os.getpid()
+        self.mask = 0
+        self.limp_mask = 0
+        self.pulses = [0] * MAX_CHANNELS
+        self.channels = {}
+        self._buf = None
+        self._attach({})
+
+    def _attach(self, claimed):
+        """Maps the table and claims a free slot in it, with claimed, {pin: (pulse, limp)}"""
+        try:
+            fd, buf = _open(self.path, os.O_RDWR)
+        except FileNotFoundError:
+            raise DaemonNotRunning(f"servo_daemon.py is not running ({self.path} missing)")
+        magic, version, channels, slots, pid, rate, *pins = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION or not pid_alive(pid):
+            buf.close()
+            os.close(fd)
+            raise DaemonNotRunning(f"servo_daemon.py is not running ({self.path} is stale)")
+        with _Locked(self.path):
+            for i in range(slots):
+                offset = HEADER_SIZE + i * SLOT_SIZE
+                owner = BODY.unpack_from(buf, offset + BODY_OFFSET)[0]
+                if owner == 0 or not pid_alive(owner):
+                    break
+            else:
+                buf.close()
+                os.close(fd)
+                raise OSError(f"all {slots} servo slots are in use")
+            if self._buf is not None:
+                self._close_map()
+            self._fd, self._buf = fd, buf
+            self.inode = os.fstat(fd).st_ino
+            self.daemon = pid
+            self.next_check = time.monotonic() + CHECK_EVERY
+            self._remap(pins[:channels], claimed)
+            self.offset = offset
+            self.seq = SEQ.unpack_from(buf, offset)[0] & ~1
+            self._publish()
+
+    def _claimed(self):
+        return {pin: (self.pulses[i], bool(self.limp_mask & 1 << i))
+                for pin, i in self.channels.items() if self.mask & 1 << i}
+
+    def _remap(self, pins, claimed):
+        """Sets the channel layout and re-applies claimed to it"""
+        self.channels = {pin: i for i, pin in enumerate(pins)}
+        self.mask = self.limp_mask = 0
+        for pin, (pulse, limp) in claimed.items():
+            i = self.channels.get(pin)
+            if i is not None:
+                self.pulses[i] = pulse
+                self.mask |= 1 << i
+                self.limp_mask |= limp << i
+
+    def _check(self):
+        """Follows a restarted daemon: a new pid in the header, or a new table file"""
+        now = time.monotonic()
+        if PID.unpack_from(self._buf, PID_OFFSET)[0] == self.daemon and now < self.next_check:
+            return
+        self.next_check = now + CHECK_EVERY
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            inode = None
+        if inode == self.inode:
+            # the same table, a daemon restarted in place (or stopped: pid 0)
+            header = HEADER.unpack_from(self._buf, 0)
+            self.daemon = header[4]
+            if list(self.channels) != list(header[6:6 + header[2]]):
+                self._remap(header[6:6 + header[2]], self._claimed())
+        elif inode is None:
+            raise DaemonNotRunning(f"servo_daemon.py is not running ({self.path} missing)")
+        else:
+            # the table was replaced: claim a slot in the new one, or keep the old
+            # mapping until a daemon is behind it
+            try:
+                self._attach(self._claimed())
+            except DaemonNotRunning:
+                pass
+
+    def channel(self, pin):
+        if pin not in self.channels:
+            raise ValueError(f"GPIO {pin} is not driven by servo_daemon.py")
+        return self.channels[pin]
+
+    def _publish(self):
+        buf, offset = self._buf, self.offset
+        self.seq += 1
+        SEQ.pack_into(buf, offset, self.seq)
+        BODY.pack_into(buf, offset + BODY_OFFSET, self.pid, self.priority,
+                       self.name.encode()[:16], time.monotonic(),
+                       self.mask, self.limp_mask, *self.pulses)
+        self.seq += 1
+        SEQ.pack_into(buf, offset, self.seq)
+
+    def write(self, pulses):
+        """Claims pins with pulse widths, {pin: microseconds}"""
+        self._check()
+        for pin, pulse in pulses.items():
+            i = self.channels[pin]
+            self.pulses[i] = pulse
+            self.mask |= 1 << i
+            self.limp_mask &= ~(1 << i)
+        self._publish()
+
+    def limp(self, pins):
+        """Claims pins to hold them limp (no pulses), over lower priorities"""
+        self._check()
+        for pin in pins:
+            bit = 1 << self.channels[pin]
+            self.mask |= bit
+            self.limp_mask |= bit
+        self._publish()
+
+    def release(self, pins=None):
+        """Stops claiming pins (default all); lower priorities take them over"""
+        self._check()
+        if pins is None:
+            self.mask = self.limp_mask = 0
+        else:
+            for pin in pins:
+                bit = 1 << self.channels[pin]
+                self.mask &= ~bit
+                self.limp_mask &= ~bit
+        self._publish()
+
+    def _close_map(self):
+        self._buf.close()
+        os.close(self._fd)
+
+    def close(self):
+        if self._buf.closed:
+            return
+        self.mask = self.limp_mask = 0
+        self.pid = 0
+        self._publish()
+        self._close_map()
+
+
+def slot_or_factory(name, factory=None):
+    """A Slot when servo_daemon.py is running, otherwise factory (default a new
+    PiGPIOFactory) to drive the pins directly. Either can be given to ServoBank"""
+    try:
+        return Slot(name)
+    except DaemonNotRunning:
+        if factory is not None:
+            return factory
+        from gpiozero.pins.pigpio import PiGPIOFactory
+        return PiGPIOFactory()
+
+
+class SlotTable:
+    """The daemon's side: creates the table and merges the slots into per-channel claims"""
+
+    def __init__(self, pins, rate, path=SHM_PATH):
+        self.path = path
+        self.pins = list(pins)
+        if len(self.pins) > MAX_CHANNELS:
+            raise ValueError(f"at most {MAX_CHANNELS} channels")
+        self.ticks = 0
+        with _Locked(path):
+            try:
+                self._fd, self._buf = _open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL)
+            except FileExistsError:
+                self._fd, self._buf = self._reuse(path)
+            HEADER.pack_into(self._buf, 0, MAGIC, VERSION, len(self.pins), MAX_SLOTS,
+                             os.getpid(), rate, *(self.pins + [0] * (MAX_CHANNELS - len(self.pins))))
+        self._seqs = [0] * MAX_SLOTS
+        self._bodies = [None] * MAX_SLOTS
+
+    def _reuse(self, path):
+        """Opens the table a previous daemon left, keeping the producers' slots.
+        One of another layout or version is replaced"""
+        fd = os.open(path, os.O_RDWR)
+        try:
+            if os.fstat(fd).st_size == SIZE:
+                buf = mmap.mmap(fd, SIZE)
+                magic, version, _, _, pid = HEADER.unpack_from(buf, 0)[:5]
+                if pid != os.getpid() and pid_alive(pid):
+                    buf.close()
+                    raise OSError(f"servo_daemon.py is already running (pid {pid})")
+                if magic == MAGIC and version == VERSION:
+                    self.ticks = TICKS.unpack_from(buf, TICKS_OFFSET)[0]
+                    return fd, buf
+                buf.close()
+        except OSError:
+            os.close(fd)
+            raise
+        os.close(fd)
+        os.unlink(path)
+        return _open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL)
+
+    def read(self):
+        """Refreshes the cached slot bodies; returns the bodies that changed
+        (None for a slot that was freed)"""
+        buf = self._buf
+        changed = []
+        for i in range(MAX_SLOTS):
+            offset = HEADER_SIZE + i * SLOT_SIZE
+            seq = SEQ.unpack_from(buf, offset)[0]
+            if seq == self._seqs[i] or seq & 1:
+                continue
+            body = BODY.unpack_from(buf, offset + BODY_OFFSET)
+            if SEQ.unpack_from(buf, offset)[0] != seq:
+                continue    # torn read, try again next tick
+            self._seqs[i] = seq
+            self._bodies[i] = body if body[0] else None
+            changed.append(self._bodies[i])
+        return changed
+
+    def claims(self):
+        """{channel: pulse, or None for limp} from the winning slot of every claimed channel"""
+        best = {}
+        for body in self._bodies:
+            if body is None:
+                continue
+            pid, priority, name, timestamp, mask, limp_mask, *pulses = body
+            for channel in range(len(self.pins)):
+                bit = 1 << channel
+                if mask & bit:
+                    current = best.get(channel)
+                    if current is None or (priority, timestamp) > current[:2]:
+                        best[channel] = (priority, timestamp,
+                                         None if limp_mask & bit else pulses[channel])
+        return {channel: claim[2] for channel, claim in best.items()}
+
+    def owners(self):
+        """(name, priority, pid) of every claimed slot"""
+        return [(body[2].rstrip(b'\0').decode(errors='replace'), body[1], body[0])
+                for body in self._bodies if body is not None]
+
+    def reap(self):
+        """Frees the slots of producers that exited without closing them.
+        Returns True if any was freed"""
+        freed = False
+        with _Locked(self.path):
+            for i, body in enumerate(self._bodies):
+                if body is not None and not pid_alive(body[0]):
+                    offset = HEADER_SIZE + i * SLOT_SIZE
+                    seq = SEQ.unpack_from(self._buf, offset)[0] | 1
+                    SEQ.pack_into(self._buf, offset, seq)
+                    BODY.pack_into(self._buf, offset + BODY_OFFSET, 0, 0, b'', 0.0, 0, 0,
+                                   *([0] * MAX_CHANNELS))
+                    SEQ.pack_into(self._buf, offset, seq + 1)
+                    self._bodies[i] = None
+                    freed = True
+        return freed
+
+    def tick(self):
+        """Bumps the tick counter producers can watch"""
+        self.ticks += 1
+        TICKS.pack_into(self._buf, TICKS_OFFSET, self.ticks)
+
+    def close(self):
+        """Marks the table as having no daemon; the file stays for the next one"""
+        PID.pack_into(self._buf, PID_OFFSET, 0)
+        self._buf.close()
+        os.close(self._fd)
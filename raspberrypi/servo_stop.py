@@ -1,15 +1,35 @@
 from gpiozero import Servo
 from time import sleep
+import servo_slots
 
-servo1 = Servo(23) # Base
-servo2 = Servo(24) # Pitch
-servo3 = Servo(25) # Tilt
-servo4 = Servo(18) # Mouth
+PINS = (23, 24, 25, 18) # Base, Pitch, Tilt, Mouth
 
 try:
-    servo1.detach()
-    servo2.detach()
-    servo3.detach()
-    servo4.detach()
-except KeyboardInterrupt:
-    print("servo stopped")
+    # servo_daemon.py owns the pins: hold them limp over everyone else
+    slot = servo_slots.Slot('test')
+except servo_slots.DaemonNotRunning:
+    slot = None
+
+if slot is not None:
+    try:
+        slot.limp(PINS)
+        print("Servos stopped. Press CTRL+C to hand them back to the daemon.")
+        while True:
+            sleep(1)
+    except KeyboardInterrupt:
+        print("servos handed back")
+        slot.close()
+
+else:
+    servo1 = Servo(23) # Base
+    servo2 = Servo(24) # Pitch
+    servo3 = Servo(25) # Tilt
+    servo4 = Servo(18) # Mouth
+
+    try:
+        servo1.detach()
+        servo2.detach()
+        servo3.detach()
+        servo4.detach()
+    except KeyboardInterrupt:
+        print("servo stopped")
@@ -1,10 +1,11 @@
 import random
 import time
-from gpiozero import Servo
-from gpiozero.pins.pigpio import PiGPIOFactory
+from motion import MotionEngine
+from servo_bank import ServoBank
+import servo_slots
 
-# Use PiGPIO for hardware PWM (smoother servo control)
-factory = PiGPIOFactory()
+# Through servo_daemon.py when it's running, otherwise PiGPIO for hardware PWM
+factory = servo_slots.slot_or_factory('test')
 
 # Servo configurations
 # travel: full physical servo range in degrees (e.g., 190 degrees = ±95 degrees)
@@ -15,50 +16,24 @@ servo_configs = {
     'Mouth': {'pin': 18, 'travel': 180, 'rest': 0},
 }
 
-# Create Servo objects
-servos = {}
-for name, config in servo_configs.items():
-    servos[name] = Servo(config['pin'], min_pulse_width=0.5/1000, max_pulse_width=2.5/1000, pin_factory=factory)
+# Full travel for testing: no 'range', so the bank allows +/- travel/2 (see servo_bank.py)
+# deadband 0: every distinct pulse width is written
+bank = ServoBank(servo_configs, factory)
+
+def write_servo_angle(servo_name, angle):
+    # the engine writes at 50 Hz: no printing here, it would add to the jitter measured
+    bank.set_angle(servo_name, angle)
+
+def print_servo(servo_name):
+    axis = bank.axes[servo_name]
+    print(f"{servo_name}: Angle: {axis.angle}, Pulse width: {axis.pulse} us")
 
 def set_servo_angle(servo_name, angle):
-    config = servo_configs[servo_name]
-    travel = config['travel']
-    
-    # Calculate the physical range from travel
-    max_physical = travel / 2  # e.g., 190/2 = 95
-    min_physical = -max_physical  # e.g., -95
-    
-    # Use the full physical range for testing
-    min_angle = min_physical
-    max_angle = max_physical
-    
-    # Clamp the angle to the physical limits
-    clamped_angle = max(min_angle, min(angle, max_angle))
-    
-    # Convert angle to servo value: map directly from physical range to servo -1 to 1
-    value = clamped_angle / max_physical
-    
-    servos[servo_name].value = value
-    
-    print(f"{servo_name}: Angle: {clamped_angle}, Servo value: {value:.2f}")
+    write_servo_angle(servo_name, angle)
+    print_servo(servo_name)
 
 def get_current_angle(servo_name):
-    servo = servos[servo_name]
-    if servo.value is None:
-        return None
-    
-    config = servo_configs[servo_name]
-    travel = config['travel']
-    
-    # Calculate the physical range from travel
-    max_physical = travel / 2
-    min_physical = -max_physical
-    
-    # Convert servo value back to angle
-    # servo_val (-1 to 1) -> physical_angle
-    physical_angle = servo.value * max_physical
-    
-    return physical_angle
+    return bank.get_angle(servo_name)
 
 def reset_servo(servo_name):
     rest_position = servo_configs[servo_name]['rest']
@@ -67,19 +42,35 @@ def reset_servo(servo_name):
     print(f"{servo_name} reset to rest position: {rest_position} degrees")
 
 def reset_all_servos():
-    for servo_name in servos:
+    for servo_name in bank:
         reset_servo(servo_name)
 
 def deactivate_all_servos():
-    for servo in servos.values():
-        servo.value = None
+    bank.release()
     print("All servos deactivated.")
 
 def activate_all_servos():
-    for name, servo in servos.items():
+    for name in bank:
         set_servo_angle(name, servo_configs[name]['rest'])
     print("All servos activated and reset to rest positions.")
 
+# Shared motion engine for the movement sequence
+engine = MotionEngine(write_servo_angle, servo_configs, rate=50)
+
+def run_movement_sequence(servo_name, sweep=20):
+    """Sweeps the servo +/- sweep degrees around rest with eased moves"""
+    print(f"\nRunning movement sequence for {servo_name}")
+    engine.sync(get_current_angle)
+    rest = servo_configs[servo_name]['rest']
+    for target, duration, easing in ((rest - sweep, 1.0, 'ease_in_out'),
+                                     (rest + sweep, 2.0, 'ease_in_out'),
+                                     (rest - sweep, 0.5, 'linear'),
+                                     (rest, 1.0, 'ease_out')):
+        engine.move({servo_name: target}, duration, easing)
+        print_servo(servo_name)
+    print(f"Motion timing: {engine.jitter.summary()}")
+    engine.jitter.reset()
+
 def debug_servo_limits(servo_name):
     print(f"\nTesting {servo_name} limits:")
     config = servo_configs[servo_name]
@@ -195,10 +186,11 @@ def main_menu():
     while True:
         print("\nServo Debug Menu:")
         print("1. Debug Servo Limits")
-        print("2. Exit")
-        choice = input("Enter your choice (1-2): ").strip()
+        print("2. Run Movement Sequence")
+        print("3. Exit")
+        choice = input("Enter your choice (1-3): ").strip()
 
-        if choice == '1':
+        if choice in ('1', '2'):
             print("\nAvailable servos:")
             for i, name in enumerate(servo_configs.keys(), 1):
                 print(f"{i}. {name}")
@@ -207,11 +199,14 @@ def main_menu():
                 index = int(servo_choice) - 1
                 servo_name = list(servo_configs.keys())[index]
                 activate_all_servos()  # Ensure servos are attached before debugging
-                debug_servo_limits(servo_name)
+                if choice == '1':
+                    debug_servo_limits(servo_name)
+                else:
+                    run_movement_sequence(servo_name)
                 deactivate_all_servos()  # Detach after debugging
             except (ValueError, IndexError):
                 print("Invalid choice. Returning to main menu.")
-        elif choice == '2':
+        elif choice == '3':
             print("Exiting program.")
             break
         else:
@@ -227,5 +222,4 @@ if __name__ == "__main__":
         activate_all_servos()  # Ensure servos are active before final reset
         reset_all_servos()  # Ensure all servos return to rest position
         deactivate_all_servos()  # Deactivate all servos before exiting
-        for servo in servos.values():
-            servo.close()
+        bank.close()
@@ -0,0 +1,172 @@
+import mmap
+import struct
+from array import array
+from bisect import bisect_right
+
+# Keyframe show files (.skshow) for the head and jaw.
+#
+# Layout, all little endian:
+#   header      4s magic b'SKSH', H version, H axis count,
+#               I index interval (ms), I duration (ms)
+#   axis table  per axis: 8s name, I keyframe count, I keyframe offset, I index offset
+#   keyframes   per axis: count x (I time in ms, f angle in degrees), sorted by time
+#   index       per axis: (duration // interval + 1) x I, the number of the last
+#               keyframe at or before each interval boundary
+#
+# Readers memory-map the file and only touch the pages they need, so a long
+# show plays in constant memory and the index makes seeking O(1).
+MAGIC = b'SKSH'
+SHOW_VERSION = 1
+HEADER = struct.Struct('<4sHHII')
+AXIS = struct.Struct('<8sIII')
+KEYFRAME = struct.Struct('<If')
+INDEX_ENTRY = struct.Struct('<I')
+
+DEFAULT_AXES = ('Base', 'Pitch', 'Tilt', 'Mouth')
+DEFAULT_INDEX_INTERVAL_MS = 1000
+
+
+class ShowFormatError(ValueError):
+    pass
+
+
+class ShowWriter:
+    """Collects keyframes per axis and writes them out as a show file"""
+
+    def __init__(self, axes=DEFAULT_AXES, index_interval_ms=DEFAULT_INDEX_INTERVAL_MS):
+        self.axes = tuple(axes)
+        self.index_interval_ms = index_interval_ms
+        self.times = {name: array('I') for name in self.axes}
+        self.angles = {name: array('f') for name in self.axes}
+
+    def add(self, servo_name, time_s, angle):
+        """Adds a keyframe; keyframes for an axis must be added in time order"""
+        time_ms = int(round(time_s * 1000))
+        times = self.times[servo_name]
+        if times and time_ms < times[-1]:
+            raise ShowFormatError(f"{servo_name} keyframe at {time_ms} ms is out of order")
+        if times and time_ms == times[-1]:
+            # same millisecond: the newer value wins
+            self.angles[servo_name][-1] = angle
+            return
+        times.append(time_ms)
+        self.angles[servo_name].append(angle)
+
+    def write(self, path):
+        duration_ms = max((t[-1] for t in self.times.values() if t), default=0)
+        index_count = duration_ms // self.index_interval_ms + 1
+        offset = HEADER.size + AXIS.size * len(self.axes)
+        table = []
+        for name in self.axes:
+            count = len(self.times[name])
+            keyframe_offset = offset
+            index_offset = keyframe_offset + count * KEYFRAME.size
+            offset = index_offset + index_count * INDEX_ENTRY.size
+            table.append((name, count, keyframe_offset, index_offset))
+
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, SHOW_VERSION, len(self.axes),
+                                self.index_interval_ms, duration_ms))
+            for name, count, keyframe_offset, index_offset in table:
+                f.write(AXIS.pack(name.encode('ascii'), count, keyframe_offset, index_offset))
+            for name in self.axes:
+                times = self.times[name]
+                angles = self.angles[name]
+                f.write(b''.join(KEYFRAME.pack(t, angle) for t, angle in zip(times, angles)))
+                f.write(b''.join(INDEX_ENTRY.pack(max(0, bisect_right(times, i * self.index_interval_ms) - 1))
+                                 for i in range(index_count)))
+
+
+class _Axis:
+    __slots__ = ('name', 'count', 'keyframe_offset', 'index_offset', 'cursor')
+
+    def __init__(self, name, count, keyframe_offset, index_offset):
+        self.name = name
+        self.count = count
+        self.keyframe_offset = keyframe_offset
+        self.index_offset = index_offset
+        self.cursor = 0
+
+
+class ShowReader:
+    """Memory-mapped show file with indexed seeking and interpolated sampling"""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ShowFormatError(f"{path} is empty")
+        magic, version, axis_count, self.index_interval_ms, self.duration_ms = \
+            HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ShowFormatError(f"{path} is not a show file")
+        if version != SHOW_VERSION:
+            self.close()
+            raise ShowFormatError(f"unsupported show version {version}")
+        self.index_count = self.duration_ms // self.index_interval_ms + 1
+        self.axes = {}
+        for i in range(axis_count):
+            name, count, keyframe_offset, index_offset = \
+                AXIS.unpack_from(self._map, HEADER.size + i * AXIS.size)
+            name = name.rstrip(b'\0').decode('ascii')
+            self.axes[name] = _Axis(name, count, keyframe_offset, index_offset)
+
+    @property
+    def duration(self):
+        return self.duration_ms / 1000
+
+    def _keyframe(self, axis, i):
+        return KEYFRAME.unpack_from(self._map, axis.keyframe_offset + i * KEYFRAME.size)
+
+    def _seek_axis(self, axis, t_ms):
+        slot = min(max(0, t_ms // self.index_interval_ms), self.index_count - 1)
+        axis.cursor = INDEX_ENTRY.unpack_from(self._map, axis.index_offset + slot * INDEX_ENTRY.size)[0]
+
+    def seek(self, t):
+        """Positions every axis at time t (seconds) using the index"""
+        t_ms = int(t * 1000)
+        for axis in self.axes.values():
+            if axis.count:
+                self._seek_axis(axis, t_ms)
+
+    def sample(self, t):
+        """Returns {servo_name: angle} at time t (seconds), interpolating linearly.
+        Sampling forward in time only moves each axis' cursor a few keyframes;
+        bigger jumps re-seek through the index"""
+        t_ms = t * 1000
+        angles = {}
+        for name, axis in self.axes.items():
+            if not axis.count:
+                continue
+            i = axis.cursor
+            time_ms, angle = self._keyframe(axis, i)
+            if (time_ms > t_ms and i > 0) or t_ms - time_ms > self.index_interval_ms:
+                # jumped backwards or far ahead: go through the index
+                self._seek_axis(axis, int(t_ms))
+                i = axis.cursor
+                time_ms, angle = self._keyframe(axis, i)
+            while i + 1 < axis.count:
+                next_ms, next_angle = self._keyframe(axis, i + 1)
+                if next_ms > t_ms:
+                    break
+                i, time_ms, angle = i + 1, next_ms, next_angle
+            axis.cursor = i
+            if t_ms <= time_ms or i + 1 >= axis.count:
+                angles[name] = angle
+            else:
+                next_ms, next_angle = self._keyframe(axis, i + 1)
+                angles[name] = angle + (next_angle - angle) * (t_ms - time_ms) / (next_ms - time_ms)
+        return angles
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,60 @@
+import argparse
+import time
+from show_file import ShowReader
+from servo_client import ServoClient
+
+# Plays a .skshow file in real time by streaming binary frames to servo_server.py.
+#
+#   python3 show_player.py show.skshow --host 127.0.0.1 --start 12.5
+
+def play(reader, output, rate=50.0, start=0.0, end=None):
+    """Samples reader at rate Hz from start seconds and calls output(angles) every tick.
+    Ticks run on monotonic deadlines; if we fall behind, show time keeps up with the
+    clock and the missed ticks are skipped"""
+    if end is None:
+        end = reader.duration
+    period = 1.0 / rate
+    reader.seek(start)
+    deadline = time.monotonic()
+    origin = deadline - start
+    while True:
+        t = min(deadline - origin, end)
+        output(reader.sample(t))
+        if t >= end:
+            break
+        deadline += period
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        elif -delay > period:
+            deadline = time.monotonic()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play a show file to servo_server.py")
+    parser.add_argument('show')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8888)
+    parser.add_argument('--rate', type=float, default=50.0, help="servo tick rate in Hz (default 50)")
+    parser.add_argument('--start', type=float, default=0.0, help="start time in seconds")
+    parser.add_argument('--axes', default=None,
+                        help="comma separated axes to play, e.g. Base,Pitch,Tilt (default all)")
+    parser.add_argument('--loop', action='store_true')
+    args = parser.parse_args()
+
+    axes = set(args.axes.split(',')) if args.axes else None
+    with ShowReader(args.show) as reader, ServoClient(args.host, args.port) as client:
+        def send(angles):
+            if axes is not None:
+                angles = {name: angle for name, angle in angles.items() if name in axes}
+            client.send(**angles)
+
+        print(f"Playing {args.show} ({reader.duration:.1f} s, axes: {', '.join(reader.axes)})")
+        try:
+            start = args.start
+            while True:
+                play(reader, send, args.rate, start)
+                if not args.loop:
+                    break
+                start = 0.0
+        except KeyboardInterrupt:
+            print("Stopped")
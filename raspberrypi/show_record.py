@@ -0,0 +1,98 @@
+import argparse
+import socket
+import time
+import servo_protocol
+from show_file import ShowWriter
+
+# Records a live UDP session (text or binary commands, e.g. from the Godot
+# tool) into a .skshow file.
+#
+# Point the sender at this port instead of servo_server.py, or use --forward
+# to pass every packet on to a running server so the head moves while you record:
+#   python3 servo_server.py            (on 8888)
+#   python3 show_record.py take1.skshow --port 8890 --forward 127.0.0.1:8888
+
+class SessionRecorder:
+    """Turns timestamped servo commands into keyframes.
+    Repeated values are dropped, but the last repeat before a change is kept
+    so holds play back as holds instead of slow ramps"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.last = {}   # servo_name -> (time of last keyframe, angle)
+        self.held = {}   # servo_name -> latest time the unchanged angle was seen
+
+    def add(self, servo_name, t, angle):
+        last = self.last.get(servo_name)
+        if last is not None and last[1] == angle:
+            self.held[servo_name] = t
+            return
+        held = self.held.pop(servo_name, None)
+        if held is not None:
+            self.writer.add(servo_name, held, last[1])
+        self.writer.add(servo_name, t, angle)
+        self.last[servo_name] = (t, angle)
+
+    def finish(self):
+        for servo_name, held in self.held.items():
+            self.writer.add(servo_name, held, self.last[servo_name][1])
+        self.held = {}
+
+def record(path, port=8888, forward=None, duration=None):
+    writer = ShowWriter()
+    recorder = SessionRecorder(writer)
+    sequence_filter = servo_protocol.SequenceFilter()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('0.0.0.0', port))
+    sock.settimeout(0.5)
+    # --forward: a socket per original sender, so the server's per-sender
+    # sequence filtering sees the same streams (as in udp_log.py replay)
+    relays = {}
+    packets = 0
+    start = None
+    print(f"Recording UDP port {port} to {path}. Press CTRL+C to stop.")
+    try:
+        while duration is None or start is None or time.monotonic() - start < duration:
+            try:
+                data, addr = sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            now = time.monotonic()
+            if start is None:
+                start = now
+            if forward is not None:
+                relay = relays.get(addr)
+                if relay is None:
+                    relay = relays[addr] = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                relay.sendto(data, forward)
+            try:
+                commands = servo_protocol.commands(data, addr, sequence_filter)
+            except (servo_protocol.ProtocolError, UnicodeDecodeError) as e:
+                print(f"Ignoring bad packet from {addr[0]}: {e}")
+                continue
+            packets += 1
+            for servo_name, angle in commands:
+                recorder.add(servo_name, now - start, angle)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+        for relay in relays.values():
+            relay.close()
+    recorder.finish()
+    writer.write(path)
+    keyframes = sum(len(t) for t in writer.times.values())
+    print(f"Saved {packets} packets as {keyframes} keyframes to {path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record a live UDP servo session into a show file")
+    parser.add_argument('show')
+    parser.add_argument('--port', type=int, default=8888)
+    parser.add_argument('--forward', default=None, help="host:port of a servo_server to relay packets to")
+    parser.add_argument('--duration', type=float, default=None, help="stop after this many seconds")
+    args = parser.parse_args()
+    forward = None
+    if args.forward:
+        host, _, fport = args.forward.rpartition(':')
+        forward = (host, int(fport))
+    record(args.show, args.port, forward, args.duration)
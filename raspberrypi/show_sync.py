@@ -0,0 +1,667 @@
+import argparse
+import collections
+import heapq
+import os
+import random
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import instrument
+
+# Shared show clock for several skeletons over UDP multicast.
+#
+# One coordinator multicasts a beacon with its show clock and the cues (start a
+# vocal track, start a head timeline) at show times. Every node polls the
+# coordinator NTP style (t1 node send, t2 coordinator receive, t3 coordinator
+# send, t4 node receive), estimates its clock's offset and drift from the
+# show clock, and fires each cue when its own synced clock reaches the cue's
+# time. Nodes report when they fired every cue, so the coordinator can print
+# the skew between them.
+#
+#   python3 show_sync.py coordinator --script yard.cues
+#   python3 show_sync.py node --name skull1 --shows shows/     (head timelines to servo_server.py)
+#   python3 show_sync.py test --nodes 3                        (loopback, reports the skew)
+#
+# ChatterPi joins as a node with PROP_TRIGGER = SYNC (see its config.ini [SYNC]).
+#
+# A cue script has one cue per line: seconds from the start, kind, argument
+# and optionally the node that should fire it (default all of them):
+#   0    show  wave.skshow
+#   4.0  track v01.wav  skull1
+#   6.5  track v02.wav  skull2
+#
+# Every message starts with HEAD (4s magic b'SKSY', B version, B type, H reserved)
+# and the coordinator's session, a random number picked at startup, so nodes
+# start over when the coordinator is restarted. All times in messages are show
+# times (seconds on the coordinator's clock) except a node's own t1.
+MAGIC = b'SKSY'
+SYNC_VERSION = 1
+HEAD = struct.Struct('<4sBBHI')
+BEACON, REQUEST, REPLY, CUE, REPORT = range(5)
+BODIES = {
+    BEACON: struct.Struct('<d'),            # show time
+    REQUEST: struct.Struct('<Id16s'),       # seq, t1, node name
+    REPLY: struct.Struct('<Iddd'),          # seq, t1, t2, t3
+    CUE: struct.Struct('<Id16s16s'),        # cue id, show time, node name ('' all), kind; argument follows
+    REPORT: struct.Struct('<I16sddd'),      # cue id, node name, fired at (show time), time.monotonic(), error
+}
+MAX_ARG = 256
+
+GROUP = '239.255.42.99'
+GROUP_PORT = 8896           # beacons and cues, multicast
+COORDINATOR_PORT = 8895     # requests and reports, unicast
+
+BEACON_INTERVAL = 1.0
+# a node's first polls come quickly so it syncs within a second (NTP's iburst)
+BURST_POLLS = 8
+BURST_INTERVAL = 0.1
+POLL_INTERVAL = 1.0
+# cues go out this long before they are due, CUE_REPEATS times in case one is lost
+ANNOUNCE_AHEAD = 1.0
+CUE_REPEATS = 3
+CUE_REPEAT_GAP = 0.05
+# the cue thread re-reads the clock estimate at least this often while waiting
+RESCHEDULE = 0.1
+# a node is listed in the skew report while it has polled within this long
+NODE_TIMEOUT = 5.0
+# a cue's skew is reported once every node has, or this long after it was due
+REPORT_WAIT = 2.0
+
+# clock filter: offset and drift come from a line through the lowest-delay half
+# of the newest WINDOW samples, drift only once they span MIN_DRIFT_SPAN seconds
+WINDOW = 64
+MIN_DRIFT_SPAN = 5.0
+MAX_DRIFT = 500e-6
+
+SYNC_DELAY = instrument.ring('sync.round_trip')
+CUE_LATENESS = instrument.ring('sync.cue_lateness')
+CUES_FIRED = instrument.counter('sync.cues')
+CUES_LOST = instrument.counter('sync.cues_late')
+
+
+class SyncError(ValueError):
+    pass
+
+
+def _name(value):
+    return value.encode()[:16]
+
+def _text(raw):
+    return raw.rstrip(b'\0').decode(errors='replace')
+
+
+def pack(kind, session, *fields, tail=b''):
+    return HEAD.pack(MAGIC, SYNC_VERSION, kind, 0, session) + BODIES[kind].pack(*fields) + tail
+
+
+def unpack(data):
+    """Returns (type, session, fields, tail) of a message"""
+    if len(data) < HEAD.size:
+        raise SyncError("too short")
+    magic, version, kind, _, session = HEAD.unpack_from(data)
+    if magic != MAGIC or version != SYNC_VERSION or kind not in BODIES:
+        raise SyncError("not a show sync message")
+    body = BODIES[kind]
+    if len(data) < HEAD.size + body.size:
+        raise SyncError("truncated message")
+    return kind, session, body.unpack_from(data, HEAD.size), data[HEAD.size + body.size:]
+
+
+class Cue:
+    __slots__ = ('id', 'at', 'kind', 'arg', 'node')
+
+    def __init__(self, id, at, kind, arg='', node=''):
+        self.id = id
+        self.at = at
+        self.kind = kind
+        self.arg = arg
+        self.node = node
+
+    def __lt__(self, other):
+        return (self.at, self.id) < (other.at, other.id)
+
+    def __repr__(self):
+        return f"cue {self.id} {self.kind} {self.arg}".rstrip() + (f" on {self.node}" if self.node else "")
+
+    def encode(self, session):
+        return pack(CUE, session, self.id, self.at, _name(self.node), _name(self.kind),
+                    tail=self.arg.encode()[:MAX_ARG])
+
+    @classmethod
+    def decode(cls, fields, tail):
+        id, at, node, kind = fields
+        return cls(id, at, _text(kind), tail.decode(errors='replace'), _text(node))
+
+
+def read_script(path):
+    """Returns [(seconds, kind, arg, node)] from a cue script"""
+    cues = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            words = line.split('#', 1)[0].split()
+            if not words:
+                continue
+            if len(words) not in (3, 4):
+                raise SyncError(f"{path}:{number}: expected 'seconds kind argument [node]'")
+            try:
+                seconds = float(words[0])
+            except ValueError:
+                raise SyncError(f"{path}:{number}: bad time {words[0]!r}") from None
+            cues.append((seconds, words[1], words[2], words[3] if len(words) == 4 else ''))
+    return cues
+
+
+def multicast_socket(group, port, interface='0.0.0.0'):
+    """A socket receiving group:port; several processes on one host can share it"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('', port))
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                    socket.inet_aton(group) + socket.inet_aton(interface))
+    return sock
+
+
+class SyncedClock:
+    """Estimates show time from a local clock, the way NTP does: every
+    exchange gives an offset (show - local) and a round-trip delay, and the
+    offset is only as good as the delay is short. A line through the
+    lowest-delay samples gives the offset and the drift of the local clock"""
+
+    def __init__(self, window=WINDOW):
+        self.samples = collections.deque(maxlen=window)    # (local time, offset, delay)
+        # (reference local time, offset there, drift), swapped in whole
+        self.estimate = None
+        self.error = None       # half the best round trip, seconds
+
+    @property
+    def synced(self):
+        return self.estimate is not None
+
+    def reset(self):
+        self.samples.clear()
+        self.estimate = None
+        self.error = None
+
+    def add(self, t1, t2, t3, t4):
+        """Adds one exchange: t1/t4 local send/receive, t2/t3 show time receive/send"""
+        offset = ((t2 - t1) + (t3 - t4)) / 2
+        delay = max(0.0, (t4 - t1) - (t3 - t2))
+        self.samples.append(((t1 + t4) / 2, offset, delay))
+        self._fit()
+        return offset, delay
+
+    def _fit(self):
+        best = sorted(self.samples, key=lambda s: s[2])[:max(1, len(self.samples) // 2)]
+        self.error = best[0][2] / 2
+        span = max(s[0] for s in best) - min(s[0] for s in best)
+        if len(best) < 4 or span < MIN_DRIFT_SPAN:
+            # too little history for drift: the lowest-delay offset of the newest samples
+            recent = list(self.samples)[-BURST_POLLS:]
+            local, offset, _ = min(recent, key=lambda s: s[2])
+            self.estimate = (local, offset, 0.0)
+            return
+        ref = sum(s[0] for s in best) / len(best)
+        mean = sum(s[1] for s in best) / len(best)
+        dt = [s[0] - ref for s in best]
+        drift = sum(d * (s[1] - mean) for d, s in zip(dt, best)) / sum(d * d for d in dt)
+        self.estimate = (ref, mean, max(-MAX_DRIFT, min(MAX_DRIFT, drift)))
+
+    def show(self, local):
+        """Show time at local time local, None until synced"""
+        estimate = self.estimate
+        if estimate is None:
+            return None
+        ref, offset, drift = estimate
+        return local + offset + drift * (local - ref)
+
+    def local(self, show):
+        """Local time when the show clock reads show, None until synced"""
+        estimate = self.estimate
+        if estimate is None:
+            return None
+        ref, offset, drift = estimate
+        return (show - offset + drift * ref) / (1 + drift)
+
+
+class LocalClock:
+    """time.monotonic(), optionally with an offset and a drift so a loopback
+    test can give every node a clock of its own"""
+
+    def __init__(self, offset=0.0, drift_ppm=0.0):
+        self.offset = offset
+        self.rate = 1 + drift_ppm * 1e-6
+
+    def __call__(self):
+        return time.monotonic() * self.rate + self.offset
+
+
+class Coordinator:
+    """Keeps the show clock, answers the nodes' polls and multicasts cues"""
+
+    def __init__(self, group=GROUP, group_port=GROUP_PORT, port=COORDINATOR_PORT,
+                 interface='0.0.0.0', verbose=True):
+        self.session = random.getrandbits(32)
+        self.epoch = time.monotonic()
+        self.group = (group, group_port)
+        self.verbose = verbose
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('', port))
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        self.sock.settimeout(RESCHEDULE)
+        self.nodes = {}         # name -> time.monotonic() of its last poll
+        self.cues = {}          # id -> Cue
+        self.reports = {}       # cue id -> {node: (fired at, monotonic, error)}
+        self.skews = []         # (cue, {node: report}) once reported
+        self._announce = []     # heap of (send at, repeat, cue)
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def now(self):
+        """Show time"""
+        return time.monotonic() - self.epoch
+
+    def cue(self, kind, arg='', at=None, node=''):
+        """Schedules a cue at show time at (default: as soon as every node can have it)"""
+        if at is None:
+            at = self.now() + ANNOUNCE_AHEAD + CUE_REPEATS * CUE_REPEAT_GAP
+        with self._lock:
+            cue = Cue(self._next_id, at, kind, arg, node)
+            self._next_id += 1
+            self.cues[cue.id] = cue
+            heapq.heappush(self._announce, (at - ANNOUNCE_AHEAD, 0, cue))
+        return cue
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sock.close()
+
+    def active_nodes(self):
+        now = time.monotonic()
+        return sorted(name for name, seen in self.nodes.items() if now - seen < NODE_TIMEOUT)
+
+    def _run(self):
+        next_beacon = 0.0
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now >= next_beacon:
+                next_beacon = now + BEACON_INTERVAL
+                self.sock.sendto(pack(BEACON, self.session, self.now()), self.group)
+            self._send_cues()
+            self._check_reports()
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self._stop.is_set():
+                    return
+                raise
+            t2 = self.now()
+            try:
+                kind, session, fields, tail = unpack(data)
+            except SyncError:
+                continue
+            if session != self.session:
+                continue
+            if kind == REQUEST:
+                seq, t1, name = fields
+                self.nodes[_text(name)] = time.monotonic()
+                self.sock.sendto(pack(REPLY, self.session, seq, t1, t2, self.now()), addr)
+            elif kind == REPORT:
+                id, name, fired, mono, error = fields
+                self.reports.setdefault(id, {})[_text(name)] = (fired, mono, error)
+
+    def _send_cues(self):
+        with self._lock:
+            now = self.now()
+            while self._announce and self._announce[0][0] <= now:
+                _, repeat, cue = heapq.heappop(self._announce)
+                self.sock.sendto(cue.encode(self.session), self.group)
+                if repeat + 1 < CUE_REPEATS:
+                    heapq.heappush(self._announce, (now + CUE_REPEAT_GAP, repeat + 1, cue))
+
+    def _check_reports(self):
+        now = self.now()
+        for id in sorted(self.reports):
+            cue = self.cues.get(id)
+            if cue is None:
+                del self.reports[id]
+                continue
+            reports = self.reports[id]
+            expected = [n for n in self.active_nodes() if not cue.node or n == cue.node]
+            if now < cue.at + REPORT_WAIT and any(n not in reports for n in expected):
+                continue
+            del self.reports[id]
+            self.skews.append((cue, reports))
+            if self.verbose:
+                print(skew_line(cue, reports))
+
+
+def skew_line(cue, reports):
+    """Summary of when the nodes fired a cue, by their synced clocks"""
+    fired = [r[0] for r in reports.values()]
+    error = max(r[2] for r in reports.values())
+    line = (f"{cue} at {cue.at:.3f}: {len(reports)} node(s), "
+            f"late {(min(fired) - cue.at) * 1000:+.2f} to {(max(fired) - cue.at) * 1000:+.2f} ms")
+    if len(fired) > 1:
+        line += f", skew {(max(fired) - min(fired)) * 1000:.2f} ms"
+    return line + f" (clock error ±{error * 1000:.2f} ms)"
+
+
+class Node:
+    """Follows the coordinator's show clock and fires its cues on time.
+    handler(cue, late) is called from the cue thread, late in seconds; it
+    should return quickly and start anything long on its own thread"""
+
+    def __init__(self, name, handler, group=GROUP, group_port=GROUP_PORT,
+                 interface='0.0.0.0', clock=time.monotonic):
+        self.name = name
+        self.handler = handler
+        self.clock = clock
+        self.synced = SyncedClock()
+        self.session = None
+        self.coordinator = None     # address polls and reports go to
+        self.listen = multicast_socket(group, group_port, interface)
+        self.listen.settimeout(RESCHEDULE)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.settimeout(RESCHEDULE)
+        self.seen = set()           # cue ids of this session
+        self.pending = []           # heap of cues
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for target in (self._receive, self._poll, self._cues):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join()
+        self.listen.close()
+        self.sock.close()
+
+    def now(self):
+        """Show time by this node's synced clock, None until synced"""
+        return self.synced.show(self.clock())
+
+    def _join(self, session, host, port):
+        """A new coordinator (or a restarted one): start over"""
+        self.session = session
+        self.coordinator = (host, port)
+        self.synced.reset()
+        with self._lock:
+            self.seen.clear()
+            self.pending = []
+        print(f"{self.name}: following the show clock of {host}:{port}")
+
+    def _receive(self):
+        """Beacons and cues from the group"""
+        while not self._stop.is_set():
+            try:
+                data, addr = self.listen.recvfrom(2048)
+                kind, session, fields, tail = unpack(data)
+            except (socket.timeout, SyncError):
+                continue
+            except OSError:
+                if self._stop.is_set():
+                    return
+                raise
+            if kind == BEACON and session != self.session:
+                self._join(session, *addr)
+            elif kind == CUE and session == self.session:
+                cue = Cue.decode(fields, tail)
+                if cue.node not in ('', self.name):
+                    continue
+                with self._lock:
+                    if cue.id in self.seen:
+                        continue
+                    self.seen.add(cue.id)
+                    heapq.heappush(self.pending, cue)
+                self._wake.set()
+
+    def _poll(self):
+        """NTP style exchanges with the coordinator"""
+        seq = 0
+        while not self._stop.is_set():
+            session = self.session
+            if session is None:
+                self._stop.wait(BURST_INTERVAL)
+                continue
+            seq += 1
+            t1 = self.clock()
+            try:
+                self.sock.sendto(pack(REQUEST, session, seq, t1, _name(self.name)), self.coordinator)
+                deadline = time.monotonic() + POLL_INTERVAL
+                while time.monotonic() < deadline:
+                    data, _ = self.sock.recvfrom(2048)
+                    t4 = self.clock()
+                    kind, reply_session, fields, _ = unpack(data)
+                    if kind == REPLY and reply_session == session and fields[0] == seq:
+                        _, delay = self.synced.add(fields[1], fields[2], fields[3], t4)
+                        SYNC_DELAY.push(delay)
+                        self._wake.set()
+                        break
+            except (socket.timeout, SyncError):
+                pass
+            except OSError:
+                if self._stop.is_set():
+                    return
+                self._stop.wait(POLL_INTERVAL)
+            burst = len(self.synced.samples) < BURST_POLLS
+            self._stop.wait(BURST_INTERVAL if burst else POLL_INTERVAL)
+
+    def _cues(self):
+        """Fires every pending cue when the synced clock reaches it"""
+        while not self._stop.is_set():
+            self._wake.clear()
+            if not self.pending or not self.synced.synced:
+                self._wake.wait(RESCHEDULE)
+                continue
+            with self._lock:
+                cue = self.pending[0]
+                # the estimate improves while waiting, so the wait is recomputed
+                delay = self.synced.local(cue.at) - self.clock()
+                if delay <= 0:
+                    heapq.heappop(self.pending)
+            if delay > 0:
+                self._wake.wait(min(delay, RESCHEDULE))
+                continue
+            fired = self.now()
+            late = fired - cue.at
+            CUES_FIRED.inc()
+            CUE_LATENESS.push(max(0.0, late))
+            if late > RESCHEDULE:
+                CUES_LOST.inc()
+            try:
+                self.handler(cue, late)
+            finally:
+                try:
+                    self.sock.sendto(pack(REPORT, self.session, cue.id, _name(self.name), fired,
+                                          time.monotonic(), self.synced.error), self.coordinator)
+                except OSError:
+                    pass
+
+
+def test(nodes=3, cues=10, interval=1.0, warmup=3.0, offset=5.0, drift_ppm=200.0,
+         group=GROUP, group_port=GROUP_PORT, port=COORDINATOR_PORT):
+    """Runs a coordinator and nodes processes on loopback, every node with its
+    own clock offset and drift, and reports how far apart they fired each cue.
+    They share this host's time.monotonic(), which gives the true skew to
+    compare with the one the nodes estimate"""
+    coordinator = Coordinator(group, group_port, port, '127.0.0.1', verbose=False)
+    coordinator.start()
+    procs = []
+    try:
+        for i in range(nodes):
+            procs.append(subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), 'node', '--name', f'node{i + 1}',
+                 '--group', group, '--group-port', str(group_port), '--interface', '127.0.0.1',
+                 '--clock-offset', f'{random.uniform(-offset, offset):.6f}',
+                 '--clock-drift', f'{random.uniform(-drift_ppm, drift_ppm):.1f}', '--quiet'],
+                stdout=subprocess.DEVNULL))
+        print(f"Coordinator and {nodes} node(s) on loopback, offsets up to {offset:g} s, "
+              f"drift up to {drift_ppm:g} ppm; {warmup:g} s to sync")
+        time.sleep(warmup)
+        first = coordinator.now() + ANNOUNCE_AHEAD + 0.5
+        for k in range(cues):
+            coordinator.cue('mark', str(k + 1), first + k * interval)
+        time.sleep(first + (cues - 1) * interval + REPORT_WAIT + 0.5 - coordinator.now())
+        true_skews = []
+        for cue, reports in coordinator.skews:
+            truth = [r[1] - coordinator.epoch - cue.at for r in reports.values()]
+            print(skew_line(cue, reports))
+            if len(truth) == nodes and nodes > 1:
+                true_skews.append(max(truth) - min(truth))
+            print(f"    true: late {min(truth) * 1000:+.2f} to {max(truth) * 1000:+.2f} ms")
+        if true_skews:
+            true_skews.sort()
+            print(f"True inter-node skew over {len(true_skews)} cue(s): "
+                  f"median {true_skews[len(true_skews) // 2] * 1000:.2f} ms, "
+                  f"max {true_skews[-1] * 1000:.2f} ms")
+        missing = cues - len(coordinator.skews)
+        if missing or any(len(r) < nodes for _, r in coordinator.skews):
+            print(f"Incomplete: {missing} cue(s) unreported, "
+                  f"{sum(len(r) < nodes for _, r in coordinator.skews)} without every node")
+        return coordinator.skews
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+        coordinator.close()
+
+
+def show_handler(folder, host, port, rate):
+    """Cue handler playing 'show' cues (head timelines in folder) to servo_server.py,
+    from as far into the show as the cue is late"""
+    from show_file import ShowReader
+    from servo_client import ServoClient
+    import show_player
+
+    def play(path, start):
+        try:
+            with ShowReader(path) as reader, ServoClient(host, port) as client:
+                show_player.play(reader, lambda angles: client.send(**angles), rate, start)
+        except (OSError, ValueError) as e:
+            print(f"Could not play {path}: {e}")
+
+    def handler(cue, late):
+        print(f"{cue}, {late * 1000:+.1f} ms")
+        if cue.kind == 'show':
+            path = os.path.join(folder, os.path.basename(cue.arg))
+            threading.Thread(target=play, args=(path, max(0.0, late)), daemon=True).start()
+    return handler
+
+
+def coordinate(args):
+    coordinator = Coordinator(args.group, args.group_port, args.port, args.interface)
+    coordinator.start()
+    print(f"Show clock on {args.group}:{args.group_port}, session {coordinator.session:08x}")
+    try:
+        if args.script:
+            start = coordinator.now() + args.delay
+            for seconds, kind, arg, node in read_script(args.script):
+                coordinator.cue(kind, arg, start + seconds, node)
+            print(f"Cues from {args.script} start at show time {start:.3f}")
+        print("Commands: 'KIND ARG [+SECONDS] [NODE]', 'nodes', CTRL+C to stop")
+        for line in sys.stdin:
+            words = line.split()
+            if not words:
+                continue
+            if words == ['nodes']:
+                print(', '.join(coordinator.active_nodes()) or "no nodes")
+                continue
+            if len(words) < 2:
+                print("Expected 'KIND ARG [+SECONDS] [NODE]'")
+                continue
+            at, node = None, ''
+            try:
+                for word in words[2:]:
+                    if word.startswith('+'):
+                        at = coordinator.now() + float(word[1:])
+                    else:
+                        node = word
+            except ValueError:
+                print("Expected 'KIND ARG [+SECONDS] [NODE]'")
+                continue
+            print(f"Sent {coordinator.cue(words[0], words[1], at, node)}")
+        # stdin closed (e.g. run from a script): keep the clock running
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        coordinator.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared show clock and cues for several skeletons")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, help in (('coordinator', "keep the show clock and send cues"),
+                       ('node', "follow the show clock and fire cues"),
+                       ('test', "coordinator and nodes on loopback, reports their skew")):
+        p = commands.add_parser(name, help=help)
+        p.add_argument('--group', default=GROUP)
+        p.add_argument('--group-port', type=int, default=GROUP_PORT)
+        if name != 'node':
+            p.add_argument('--port', type=int, default=COORDINATOR_PORT)
+    p = commands.choices['coordinator']
+    p.add_argument('--interface', default='0.0.0.0', help="address of the interface to multicast on")
+    p.add_argument('--script', help="cue script, see the top of show_sync.py")
+    p.add_argument('--delay', type=float, default=3.0, help="seconds before the script starts (default 3)")
+    p = commands.choices['node']
+    p.add_argument('--name', default=socket.gethostname())
+    p.add_argument('--interface', default='0.0.0.0')
+    p.add_argument('--shows', default='.', help="folder of head timelines for 'show' cues")
+    p.add_argument('--host', default='127.0.0.1', help="servo_server.py address")
+    p.add_argument('--port', type=int, default=8888)
+    p.add_argument('--rate', type=float, default=50.0, help="head timeline rate in Hz (default 50)")
+    p.add_argument('--clock-offset', type=float, default=0.0, help="seconds, for testing")
+    p.add_argument('--clock-drift', type=float, default=0.0, help="ppm, for testing")
+    p.add_argument('--quiet', action='store_true')
+    p = commands.choices['test']
+    p.add_argument('--nodes', type=int, default=3)
+    p.add_argument('--cues', type=int, default=10)
+    p.add_argument('--interval', type=float, default=1.0, help="seconds between cues (default 1)")
+    p.add_argument('--warmup', type=float, default=3.0, help="seconds to sync before the first cue")
+    args = parser.parse_args()
+
+    if args.command == 'coordinator':
+        coordinate(args)
+    elif args.command == 'test':
+        test(args.nodes, args.cues, args.interval, args.warmup, group=args.group,
+             group_port=args.group_port, port=args.port)
+    else:
+        handler = show_handler(args.shows, args.host, args.port, args.rate)
+        if args.quiet:
+            handler = lambda cue, late: None
+        node = Node(args.name, handler, args.group, args.group_port, args.interface,
+                    LocalClock(args.clock_offset, args.clock_drift))
+        node.start()
+        print(f"{args.name}: waiting for a coordinator on {args.group}:{args.group_port}")
+        try:
+            while True:
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            node.close()
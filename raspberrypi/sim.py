@@ -0,0 +1,173 @@
+import sys
+import threading
+import time
+import types
+
+# Hardware-free backend for the servo scripts and ChatterPi.
+#
+# install() must run before servo_run / servo_server / audio are imported. It
+# makes PiGPIOFactory() return gpiozero's MockFactory (with PWM-capable pins)
+# and replaces the pyaudio module with FakePyAudio, whose streams run their
+# callback from a thread on a VirtualClock instead of a sound card:
+#
+#   import sim
+#   clock = sim.install()            # virtual time: buffers run back to back
+#   import servo_run                 # servos are now mock pins
+#
+# With realtime=True the fake streams pace their buffers like a real device.
+# Every stream records how long each callback took (callback_times).
+
+paInt16 = 8
+paInt32 = 2
+paContinue = 0
+paComplete = 1
+paAbort = 2
+# callback status flags
+paInputUnderflow = 1
+paInputOverflow = 2
+paOutputUnderflow = 4
+paOutputOverflow = 8
+
+_FORMAT_BYTES = {paInt16: 2, paInt32: 4}
+
+
+class VirtualClock:
+    """Stream time in seconds; advanced by the fake streams, not by the wall clock"""
+
+    def __init__(self):
+        self._now = 0.0
+        self._lock = threading.Lock()
+
+    def now(self):
+        return self._now
+
+    def advance(self, dt):
+        with self._lock:
+            self._now += dt
+            return self._now
+
+
+class FakeStream:
+    """A PyAudio callback stream without a device"""
+
+    def __init__(self, clock, realtime, rate, channels=1, format=paInt16,
+                 frames_per_buffer=1024, input=False, output=False,
+                 stream_callback=None, input_device_index=None, **kwargs):
+        self.clock = clock
+        self.realtime = realtime
+        self.rate = rate
+        self.channels = channels
+        self.sample_bytes = _FORMAT_BYTES.get(format, 2)
+        self.frames_per_buffer = frames_per_buffer
+        self.input = input
+        self.output = output
+        self.callback = stream_callback
+        self.latency = frames_per_buffer / rate
+        self.callback_times = []    # seconds spent in each callback
+        self.frames_written = 0
+        self._stop = threading.Event()
+        self._thread = None
+        if stream_callback is not None:
+            self.start_stream()
+
+    def start_stream(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        period = self.frames_per_buffer / self.rate
+        silence = bytes(self.frames_per_buffer * self.channels * self.sample_bytes)
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            if self.realtime:
+                deadline += period
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._stop.wait(delay)
+            else:
+                # let other threads (the player, the servo thread) run
+                time.sleep(0)
+            now = self.clock.advance(period)
+            time_info = {'input_buffer_adc_time': now - period,
+                         'current_time': now,
+                         'output_buffer_dac_time': now + self.latency}
+            in_data = silence if self.input else None
+            start = time.perf_counter()
+            out_data, flag = self.callback(in_data, self.frames_per_buffer, time_info, 0)
+            self.callback_times.append(time.perf_counter() - start)
+            if self.output and out_data is not None:
+                self.frames_written += len(out_data) // (self.channels * self.sample_bytes)
+            if flag != paContinue:
+                break
+        self._stop.set()
+
+    def is_active(self):
+        return not self._stop.is_set()
+
+    def is_stopped(self):
+        return self._stop.is_set()
+
+    def get_output_latency(self):
+        return self.latency
+
+    def get_input_latency(self):
+        return self.latency
+
+    def stop_stream(self):
+        self._stop.set()
+        if self._thread is not None and threading.current_thread() is not self._thread:
+            self._thread.join()
+
+    def close(self):
+        self.stop_stream()
+
+
+class FakePyAudio:
+    """The subset of pyaudio.PyAudio the audio code uses"""
+
+    def __init__(self, clock, realtime=False):
+        self.clock = clock
+        self.realtime = realtime
+        self.streams = []
+
+    def open(self, *args, **kwargs):
+        stream = FakeStream(self.clock, self.realtime, *args, **kwargs)
+        self.streams.append(stream)
+        return stream
+
+    def get_sample_size(self, format):
+        return _FORMAT_BYTES[format]
+
+    def get_format_from_width(self, width):
+        return {2: paInt16, 4: paInt32}[width]
+
+    def terminate(self):
+        for stream in self.streams:
+            stream.close()
+
+
+def pyaudio_module(clock, realtime=False):
+    """A stand-in for the pyaudio module whose PyAudio() is a FakePyAudio"""
+    module = types.ModuleType('pyaudio')
+    module.PyAudio = lambda: FakePyAudio(clock, realtime)
+    for name in ('paInt16', 'paInt32', 'paContinue', 'paComplete', 'paAbort',
+                 'paInputUnderflow', 'paInputOverflow', 'paOutputUnderflow', 'paOutputOverflow'):
+        setattr(module, name, globals()[name])
+    return module
+
+
+def install(realtime=False):
+    """Swaps in mock GPIO pins and the fake PyAudio. Returns the VirtualClock"""
+    from gpiozero import Device
+    from gpiozero.pins.mock import MockFactory, MockPWMPin
+    import gpiozero.pins.pigpio
+
+    # each PiGPIOFactory() gets its own mock board, like separate processes on a
+    # real Pi, so servo_run and servo_server can both claim pins 23-25 here
+    gpiozero.pins.pigpio.PiGPIOFactory = lambda *args, **kwargs: MockFactory(pin_class=MockPWMPin)
+    Device.pin_factory = MockFactory(pin_class=MockPWMPin)
+    clock = VirtualClock()
+    sys.modules['pyaudio'] = pyaudio_module(clock, realtime)
+    return clock
@@ -0,0 +1,26 @@
+import os
+import sys
+import pytest
+
+# the modules under test live in raspberrypi/, ChatterPi's in vendor/ChatterPi/src
+HERE = os.path.dirname(os.path.abspath(__file__))
+RASPBERRYPI = os.path.dirname(HERE)
+CHATTERPI = os.path.join(RASPBERRYPI, 'vendor', 'ChatterPi', 'src')
+for path in (RASPBERRYPI, CHATTERPI):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import sim
+
+# every test runs on the sim backend: mock pins for gpiozero and the fake
+# PyAudio, installed before any module under test imports them
+CLOCK = sim.install()
+
+
+@pytest.fixture
+def config():
+    """ChatterPi's config module with config.ini loaded; change settings with
+    monkeypatch.setattr(config, 'STYLE', 2)"""
+    import config as c
+    c.update(os.path.join(CHATTERPI, 'config.ini'))
+    return c
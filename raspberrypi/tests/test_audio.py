@@ -0,0 +1,24 @@
+import bandpassFilter
+import audio
+import micStream
+
+
+def no_design(fs):
+    raise AssertionError("the bandpass filter was designed")
+
+
+def test_no_filter_unless_style_2(config, monkeypatch):
+    monkeypatch.setattr(bandpassFilter, 'design', no_design)
+    for style in (0, 1):
+        monkeypatch.setattr(config, 'STYLE', style)
+        a = audio.AUDIO(devices=False)
+        assert a.bandpass() is None
+        assert micStream.MicJaw(a.jaw_write, 16000, False).bp is None
+
+
+def test_filter_made_once(config, monkeypatch):
+    monkeypatch.setattr(config, 'STYLE', 2)
+    a = audio.AUDIO(devices=False)
+    assert a.bp is None
+    bp = a.bandpass()
+    assert isinstance(bp, bandpassFilter.BPFilter) and a.bandpass() is bp
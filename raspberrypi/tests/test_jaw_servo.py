@@ -0,0 +1,40 @@
+import pytest
+from gpiozero import Device
+from jawServo import JawServo
+
+
+@pytest.fixture
+def jaw():
+    jaw = JawServo({'Jaw': {'pin': 18, 'travel': 180, 'range': (0, 60)}}, Device.pin_factory)
+    yield jaw
+    jaw.close()
+
+
+def pulse_us(jaw):
+    return jaw.servo.pulse_width * 1e6
+
+
+def test_angle_to_pulse(jaw):
+    jaw.set_angle('Jaw', 45)
+    assert pulse_us(jaw) == pytest.approx(2000)
+    # clamped to the range
+    jaw.set_angle('Jaw', -30)
+    assert pulse_us(jaw) == pytest.approx(1500)
+
+
+def test_travel_change(jaw):
+    jaw.set_angle('Jaw', 45)
+    jaw.configure('Jaw', {'pin': 18, 'travel': 90, 'range': (0, 60)})
+    jaw.set_angle('Jaw', 45)
+    assert pulse_us(jaw) == pytest.approx(2500)
+    jaw.set_angle('Jaw', 22.5)
+    assert pulse_us(jaw) == pytest.approx(2000)
+    assert jaw.pulse == pytest.approx(2000)
+
+
+def test_release(jaw):
+    jaw.set_angle('Jaw', 10)
+    jaw.release()
+    assert jaw.servo.value is None
+    jaw.set_angle('Jaw', 10)
+    assert jaw.servo.value is not None
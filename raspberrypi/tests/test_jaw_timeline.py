@@ -0,0 +1,50 @@
+import wave
+import numpy as np
+import pytest
+import bench
+import jawTimeline
+from bandpassFilter import BPFilter
+
+
+def per_window(path, bp):
+    """The analysis the way ChatterPi used to run it: get_avg / get_target
+    on one window of frames at a time"""
+    c = jawTimeline.c
+    j_min, j_max = jawTimeline.jaw_limits()
+    wf = wave.open(path, 'rb')
+    channels = wf.getnchannels()
+    window = jawTimeline.window_frames(wf.getframerate(), c.JAW_WINDOW)
+    if bp is not None:
+        bp.set_rate(wf.getframerate())
+    targets = []
+    while True:
+        data = wf.readframes(window)
+        if not data:
+            break
+        levels = np.absolute(np.frombuffer(data, dtype='<i2').astype(np.int32))
+        targets.append(jawTimeline.get_target(jawTimeline.get_avg(levels, channels, bp), j_min, j_max))
+    wf.close()
+    return np.array(targets, dtype='<f4')
+
+
+@pytest.mark.parametrize('style', [0, 1, 2])
+@pytest.mark.parametrize('jaw_window', [10, 20, 35])
+def test_vectorized_matches_per_window(config, monkeypatch, tmp_path, style, jaw_window):
+    monkeypatch.setattr(config, 'STYLE', style)
+    monkeypatch.setattr(config, 'JAW_WINDOW', jaw_window)
+    path = str(tmp_path / 'v01.wav')
+    # not a whole number of windows, so the short last one is covered too
+    bench.speech_like_wav(path, seconds=1.013)
+    bp = BPFilter() if style == 2 else None
+    timeline = jawTimeline.build(path, bp)
+    expected = per_window(path, BPFilter() if style == 2 else None)
+    np.testing.assert_array_equal(timeline.targets, expected)
+
+
+def test_cached_timeline(config, tmp_path):
+    path = str(tmp_path / 'v01.wav')
+    bench.speech_like_wav(path, seconds=0.5)
+    built = jawTimeline.load(path)
+    loaded = jawTimeline.load(path)
+    np.testing.assert_array_equal(built.targets, loaded.targets)
+    assert (loaded.rate, loaded.window) == (built.rate, built.window)
@@ -0,0 +1,108 @@
+import time
+import numpy as np
+import pyaudio
+import pytest
+from mixer import BufferSource, Mixer
+
+RATE = 44100
+BUFFER = 512
+DAC = 0.01      # output latency reported by the fake time_info
+
+
+def track(value, frames):
+    return np.full((frames, 2), value, dtype=np.int16)
+
+
+@pytest.fixture
+def quiet():
+    """A Mixer on a fake stream that is stopped, so the test runs the callback"""
+    m = Mixer(pyaudio.PyAudio(), BUFFER)
+    m._ensure_stream(RATE)
+    m.stream.stop_stream()
+    yield m
+    m.close()
+
+
+def run(m, frames=BUFFER):
+    now = time.monotonic()
+    time_info = {'current_time': now, 'output_buffer_dac_time': now + DAC}
+    data, flag = m._callback(None, frames, time_info, 0)
+    assert flag == pyaudio.paContinue
+    return np.frombuffer(data, dtype=np.int16).reshape(-1, 2)
+
+
+def test_plays_to_the_end():
+    m = Mixer(pyaudio.PyAudio(), BUFFER)
+    source = m.play(BufferSource([track(100, 5000)], RATE))
+    assert source.done.wait(2.0)
+    assert m.stream.frames_written >= 5000
+    assert source.latency is not None
+    m.close()
+
+
+def test_handover_finishes_the_old_source(quiet):
+    first = quiet.play(BufferSource([track(100, RATE)], RATE))
+    assert (run(quiet) == 100).all()
+    second = quiet.play(BufferSource([track(200, RATE)], RATE))
+    assert (run(quiet) == 200).all()
+    assert first.done.is_set() and not second.done.is_set()
+
+
+def test_replaced_before_it_started(quiet):
+    first = quiet.play(BufferSource([track(100, RATE)], RATE))
+    second = quiet.play(BufferSource([track(200, RATE)], RATE))
+    assert (run(quiet) == 200).all()
+    # never heard, but whoever waits on it is woken
+    assert first.done.is_set() and first.frame_pos == 0
+    quiet.stop()
+    assert (run(quiet) == 0).all()
+    assert second.done.is_set()
+
+
+def test_crossfade(quiet):
+    first = quiet.play(BufferSource([track(10000, RATE)], RATE))
+    run(quiet)
+    quiet.play(BufferSource([track(0, RATE)], RATE), crossfade_ms=1000 * BUFFER * 2 / RATE)
+    out = run(quiet)[:, 0]
+    assert out[0] == 10000 and out[-1] > 4000
+    assert (np.diff(out.astype(int)) <= 0).all()
+    out = run(quiet)[:, 0]
+    assert out[0] <= 5000 and out[-1] < 50
+    # faded out over the two buffers
+    assert first.done.is_set()
+
+
+def test_short_source_finishes(quiet):
+    source = quiet.play(BufferSource([track(100, 100)], RATE))
+    out = run(quiet)
+    assert (out[:100] == 100).all() and (out[100:] == 0).all()
+    assert source.done.is_set()
+
+
+def test_start_at_pads_with_silence(quiet):
+    source = BufferSource([track(100, RATE)], RATE)
+    source.start_at = time.monotonic() + DAC + 200 / RATE
+    quiet.play(source)
+    out = run(quiet)[:, 0]
+    lead = int(np.argmax(out != 0))
+    assert 190 <= lead <= 200
+    assert (out[lead:] == 100).all()
+
+
+def test_start_at_holds_a_source_not_yet_due(quiet):
+    playing = quiet.play(BufferSource([track(100, RATE)], RATE))
+    run(quiet)
+    source = BufferSource([track(200, RATE)], RATE)
+    source.start_at = time.monotonic() + DAC + 0.5
+    quiet.play(source)
+    assert (run(quiet) == 100).all()
+    assert not playing.done.is_set() and source.frame_pos == 0
+
+
+def test_late_start_at_seeks_in(quiet):
+    source = BufferSource([np.arange(RATE, dtype=np.int16).repeat(2).reshape(-1, 2)], RATE)
+    source.start_at = time.monotonic() + DAC - 0.1
+    quiet.play(source)
+    first = int(run(quiet)[0, 0])
+    # heard 0.1 s into the track, as if it had started on time
+    assert abs(first - RATE // 10) < RATE // 200
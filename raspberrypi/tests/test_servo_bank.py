@@ -0,0 +1,104 @@
+import struct
+import threading
+import types
+import pytest
+from servo_bank import ServoBank
+
+pigpio = pytest.importorskip('pigpio')
+
+CONFIGS = {'Base': {'pin': 23}, 'Pitch': {'pin': 24}}
+
+
+class FakePi(pigpio.pi):
+    """pigpiod that refuses the pins in refuse, without a connection"""
+
+    def __init__(self, refuse=()):
+        self.refuse = set(refuse)
+        self.pulses = {}
+        self.calls = 0
+
+    def set_servo_pulsewidth(self, pin, pulse):
+        self.calls += 1
+        if pin in self.refuse:
+            raise pigpio.error("GPIO not 0-31")
+        self.pulses[pin] = pulse
+        return 0
+
+    def get_pigpio_version(self):
+        return 79
+
+
+class FakeSocket:
+    """pigpiod's end of the command socket, answering PIGPV and SERVO"""
+
+    def __init__(self, pi, version=79):
+        self.pi = pi
+        self.version = version
+        self.replies = b''
+
+    def sendall(self, data):
+        for cmd, p1, p2, p3 in struct.iter_unpack('<IIII', data):
+            if cmd == 26:
+                result = self.version
+            elif p1 in self.pi.refuse:
+                result = (1 << 32) - 2      # PI_BAD_USER_GPIO
+            else:
+                self.pi.pulses[p1] = p2
+                result = 0
+            self.replies += struct.pack('<IIII', cmd, p1, p2, result)
+
+    def recv(self, n):
+        reply, self.replies = self.replies[:n], self.replies[n:]
+        return reply
+
+
+def batching_pi(version=79):
+    pi = FakePi()
+    pi.sl = types.SimpleNamespace(s=FakeSocket(pi, version), l=threading.Lock())
+    return pi
+
+
+def bank_on(pi):
+    return ServoBank(CONFIGS, types.SimpleNamespace(connection=pi))
+
+
+def test_writes_through_pigpio():
+    pi = FakePi()
+    bank = bank_on(pi)
+    assert bank.set_angles({'Base': 0, 'Pitch': 90}) == []
+    assert pi.pulses == {23: 1500, 24: 2500}
+    assert bank.get_angle('Pitch') == 90
+
+
+def test_refused_write_keeps_the_last_pulse():
+    pi = FakePi()
+    bank = bank_on(pi)
+    bank.set_angles({'Base': 0, 'Pitch': 0})
+    pi.refuse.add(24)
+    # the other servo in the batch is still written
+    assert bank.set_angles({'Base': 45, 'Pitch': 45}) == ['Pitch']
+    assert bank.get_angle('Base') == 45 and pi.pulses[23] == 2000
+    assert bank.get_angle('Pitch') == 0 and bank.axes['Pitch'].pulse == 1500
+    assert bank.axes['Pitch'].errors == 1
+    assert 'refused' in bank.summary()
+    assert not bank.set_angle('Pitch', 10)
+    pi.refuse.clear()
+    assert bank.set_angle('Pitch', 10)
+
+
+def test_batched_when_the_socket_checks_out():
+    pi = batching_pi()
+    bank = bank_on(pi)
+    assert bank.batch is pi.sl
+    pi.refuse.add(24)
+    assert bank.set_angles({'Base': 45, 'Pitch': 45}) == ['Pitch']
+    assert pi.pulses == {23: 2000} and pi.calls == 0
+    assert bank.round_trips == 1
+
+
+def test_one_at_a_time_when_it_does_not():
+    pi = batching_pi(version=12345)
+    bank = bank_on(pi)
+    assert bank.batch is None
+    bank.set_angles({'Base': 45, 'Pitch': 45})
+    assert pi.calls == 2 and bank.round_trips == 2
@@ -0,0 +1,54 @@
+import pytest
+import servo_daemon
+from gpiozero import Device
+from servo_bank import ServoBank
+from servo_slots import Slot, SlotTable
+
+CHANNELS = {'Base': {'pin': 23}, 'Mouth': {'pin': 18}}
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    """The daemon's table and bank (on mock pins), and a tick merging the slots"""
+    path = str(tmp_path / 'servo')
+    table = SlotTable([config['pin'] for config in CHANNELS.values()], 100, path)
+    bank = ServoBank(CHANNELS, Device.pin_factory)
+    applied = {}
+
+    def tick():
+        table.read()
+        applied.update(servo_daemon.apply_claims(table, bank, list(bank), dict(applied)))
+        return {name: axis.pulse for name, axis in bank.axes.items()}
+
+    yield path, tick
+    bank.close()
+    table.close()
+
+
+def test_head_and_jaw_merge(daemon):
+    path, tick = daemon
+    head = ServoBank({'Base': {'pin': 23}, 'Mouth': {'pin': 18, 'travel': 90, 'center': 45}},
+                     Slot('udp', path=path))
+    jaw = ServoBank({'Jaw': {'pin': 18, 'travel': 90, 'center': 45}}, Slot('jaw', path=path))
+    head.set_angles({'Base': 0, 'Mouth': 60})
+    jaw.set_angle('Jaw', 45)
+    # the jaw outranks servo_server on the shared pin
+    assert tick() == {'Base': 1500, 'Mouth': 1500}
+    jaw.release()
+    assert tick() == {'Base': 1500, 'Mouth': head.axes['Mouth'].pulse}
+    head.close()
+    jaw.close()
+    assert tick() == {'Base': None, 'Mouth': None}
+
+
+def test_pins_follow_the_merge(daemon):
+    path, tick = daemon
+    producer = ServoBank({'Base': {'pin': 23}}, Slot('idle', path=path))
+    producer.set_pulses({'Base': 2000})
+    tick()
+    pin = Device.pin_factory.pin(23)
+    # 2 ms of a 20 ms period
+    assert pin.frequency == 50 and pin.state == pytest.approx(0.1)
+    producer.close()
+    tick()
+    assert not pin.state
@@ -0,0 +1,40 @@
+from servo_protocol import SequenceFilter, SEQ_MOD, SEQ_RESTART_GAP
+
+A = ('10.0.0.2', 5000)
+B = ('10.0.0.3', 5000)
+
+
+def test_drops_stale_and_duplicate_frames():
+    f = SequenceFilter()
+    assert f.accept(A, 5, now=0.0)
+    assert not f.accept(A, 5, now=0.1)
+    assert not f.accept(A, 4, now=0.2)
+    assert f.accept(A, 6, now=0.3)
+    # other senders have their own sequence
+    assert f.accept(B, 1, now=0.4)
+    assert f.dropped == 2
+
+
+def test_wraparound_and_restart():
+    f = SequenceFilter()
+    assert f.accept(A, SEQ_MOD - 1, now=0.0)
+    assert f.accept(A, 0, now=0.1)
+    assert f.accept(A, SEQ_MOD - SEQ_RESTART_GAP, now=0.2)
+
+
+def test_idle_senders_expire():
+    f = SequenceFilter(timeout=10.0)
+    f.accept(A, 100, now=0.0)
+    f.accept(B, 100, now=0.0)
+    f.accept(B, 101, now=9.0)
+    f.prune(now=15.0)
+    assert list(f.last_seq) == [B]
+    # a sender that was forgotten starts over at any sequence number
+    assert f.accept(A, 1, now=15.5)
+
+
+def test_prunes_while_accepting():
+    f = SequenceFilter(timeout=10.0)
+    f.accept(A, 1, now=f.next_prune - 20.0)
+    f.accept(B, 1, now=f.next_prune)
+    assert list(f.last_seq) == [B]
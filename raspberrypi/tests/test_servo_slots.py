@@ -0,0 +1,143 @@
+import os
+import pytest
+import servo_slots
+from servo_slots import Slot, SlotTable, DaemonNotRunning
+
+PINS = [23, 24, 25, 18]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'servo')
+
+
+@pytest.fixture
+def table(path):
+    table = SlotTable(PINS, 100, path)
+    yield table
+    table.close()
+
+
+def merged(table):
+    table.read()
+    return table.claims()
+
+
+def test_no_daemon(path):
+    with pytest.raises(DaemonNotRunning):
+        Slot('udp', path=path)
+
+
+def test_claim_and_release(table, path):
+    slot = Slot('udp', path=path)
+    slot.write({23: 1000, 18: 1600})
+    assert merged(table) == {0: 1000, 3: 1600}
+    slot.release([23])
+    assert merged(table) == {3: 1600}
+    slot.limp([24])
+    assert merged(table) == {1: None, 3: 1600}
+    slot.close()
+    assert merged(table) == {}
+
+
+def test_unknown_pin(table, path):
+    slot = Slot('udp', path=path)
+    with pytest.raises(ValueError):
+        slot.channel(4)
+    slot.close()
+
+
+def test_priority(table, path):
+    low = Slot('idle', path=path)
+    high = Slot('jaw', path=path)
+    low.write({23: 1000, 24: 1100})
+    high.write({23: 2000})
+    assert merged(table) == {0: 2000, 1: 1100}
+    high.release()
+    assert merged(table) == {0: 1000, 1: 1100}
+    # on a tie the newest write wins
+    same = Slot('idle', path=path)
+    same.write({24: 1900})
+    assert merged(table) == {0: 1000, 1: 1900}
+    for slot in (low, high, same):
+        slot.close()
+
+
+def test_torn_read_keeps_previous(table, path):
+    slot = Slot('udp', path=path)
+    slot.write({23: 1000})
+    assert merged(table) == {0: 1000}
+    # a writer caught half way: odd sequence number
+    servo_slots.SEQ.pack_into(slot._buf, slot.offset, slot.seq + 1)
+    servo_slots.BODY.pack_into(slot._buf, slot.offset + servo_slots.BODY_OFFSET, slot.pid,
+                               slot.priority, b'udp', 0.0, 1, 0, 1234, *[0] * 7)
+    assert merged(table) == {0: 1000}
+    slot.seq += 2
+    slot.write({23: 1500})
+    assert merged(table) == {0: 1500}
+    slot.close()
+
+
+def test_reap(table, path):
+    pid = os.fork()
+    if pid == 0:
+        slot = Slot('udp', path=path)
+        slot.write({25: 1700})
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert merged(table) == {2: 1700}
+    assert table.reap()
+    assert merged(table) == {}
+    assert table.owners() == []
+
+
+def test_daemon_restart_keeps_claims(path):
+    table = SlotTable(PINS, 100, path)
+    slot = Slot('udp', path=path)
+    slot.write({23: 1000})
+    table.close()
+    # writes while no daemon runs stay in the slot for the next one
+    slot.write({24: 1200})
+    table = SlotTable(PINS, 100, path)
+    assert merged(table) == {0: 1000, 1: 1200}
+    slot.write({23: 1100})
+    assert merged(table) == {0: 1100, 1: 1200}
+    assert slot.daemon == os.getpid()
+    slot.close()
+    table.close()
+
+
+def test_replaced_table(path):
+    table = SlotTable(PINS, 100, path)
+    slot = Slot('udp', path=path)
+    slot.write({23: 1000})
+    table.close()
+    os.unlink(path)
+    # another layout: the producer follows to the new file and keeps its claims
+    table = SlotTable([18, 23], 100, path)
+    slot.next_check = 0
+    slot.write({18: 1500})
+    assert merged(table) == {0: 1500, 1: 1000}
+    slot.close()
+    table.close()
+
+
+def test_table_removed(path):
+    table = SlotTable(PINS, 100, path)
+    slot = Slot('udp', path=path)
+    table.close()
+    os.unlink(path)
+    slot.next_check = 0
+    with pytest.raises(DaemonNotRunning):
+        slot.write({23: 1000})
+
+
+def test_second_daemon_refused(table, path):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            SlotTable(PINS, 100, path)
+        except OSError:
+            os._exit(0)
+        os._exit(1)
+    assert os.waitpid(pid, 0)[1] == 0
@@ -0,0 +1,58 @@
+import random
+import pytest
+from show_sync import SyncedClock, MIN_DRIFT_SPAN, MAX_DRIFT
+
+
+def exchanges(clock, count, offset, drift, interval=0.5, jitter=0.005, seed=1):
+    """Feeds clock count polls of a show clock running at offset + (1 + drift)
+    times the local one, over a network adding up to jitter each way"""
+    rng = random.Random(seed)
+    show = lambda local: offset + local * (1 + drift)
+    t1 = 100.0
+    for i in range(count):
+        up, down, turn = rng.uniform(0.001, jitter), rng.uniform(0.001, jitter), 0.0002
+        t2 = show(t1 + up)
+        t3 = t2 + turn
+        t4 = t1 + up + turn + down
+        clock.add(t1, t2, t3, t4)
+        t1 += interval
+    return show, t1
+
+
+def test_not_synced():
+    clock = SyncedClock()
+    assert not clock.synced
+    assert clock.show(1.0) is None and clock.local(1.0) is None
+
+
+def test_offset_from_a_burst():
+    clock = SyncedClock()
+    show, now = exchanges(clock, 8, offset=5.0, drift=0.0, interval=0.1)
+    assert clock.synced
+    assert clock.show(now) == pytest.approx(show(now), abs=0.005)
+    assert clock.estimate[2] == 0.0    # too short for drift
+
+
+@pytest.mark.parametrize('drift', [-200e-6, 0.0, 300e-6])
+def test_offset_and_drift(drift):
+    clock = SyncedClock()
+    count = int(4 * MIN_DRIFT_SPAN / 0.5)
+    show, now = exchanges(clock, count, offset=-3.0, drift=drift)
+    ref, offset, estimated = clock.estimate
+    assert estimated == pytest.approx(drift, abs=50e-6)
+    # and still right a minute after the last exchange
+    assert clock.show(now + 60) == pytest.approx(show(now + 60), abs=0.005)
+    assert clock.local(clock.show(now)) == pytest.approx(now, abs=1e-6)
+
+
+def test_drift_is_limited():
+    clock = SyncedClock()
+    exchanges(clock, 40, offset=0.0, drift=0.01)
+    assert clock.estimate[2] == MAX_DRIFT
+
+
+def test_reset():
+    clock = SyncedClock()
+    exchanges(clock, 8, offset=1.0, drift=0.0)
+    clock.reset()
+    assert not clock.synced and not clock.samples
@@ -0,0 +1,79 @@
+import threading
+import time
+from gpiozero import Button
+from gpiozero.pins.mock import MockFactory
+import triggers
+from triggers import TriggerScheduler
+
+
+def test_pir_edge():
+    factory = MockFactory()
+    trigger = TriggerScheduler('PIR', 0, Button(23, pull_up=False, pin_factory=factory))
+    trigger.arm()
+    assert not trigger.wait(0.01)
+    factory.pin(23).drive_high()
+    assert trigger.wait(0.5)
+    assert trigger.count == 1 and trigger.latency < 0.5
+    trigger.close()
+
+
+def test_pir_cooldown():
+    factory = MockFactory()
+    trigger = TriggerScheduler('PIR', 0, Button(23, pull_up=False, pin_factory=factory))
+    pin = factory.pin(23)
+    trigger.arm(cooldown=10.0)
+    pin.drive_high()
+    pin.drive_low()
+    assert not trigger.wait(0.01)
+    trigger.arm()
+    pin.drive_high()
+    assert trigger.wait(0.5)
+    trigger.close()
+
+
+def test_timer(monkeypatch):
+    monkeypatch.setattr(triggers, 'WAIT_SLICE', 0.01)
+    trigger = TriggerScheduler('TIMER', 0.05)
+    start = time.monotonic()
+    trigger.arm()
+    assert not trigger.wait(0.01)
+    assert trigger.wait(1.0)
+    assert time.monotonic() - start >= 0.05
+    # latency counts from the deadline, not from when wait() noticed it
+    assert 0 <= trigger.latency < 0.05
+
+
+def test_start():
+    trigger = TriggerScheduler('START', 0)
+    trigger.arm()
+    assert trigger.wait(0)
+    assert trigger.count == 1
+
+
+def test_sync_fired_from_another_thread():
+    trigger = TriggerScheduler('SYNC', 0)
+    trigger.arm()
+    cued = time.monotonic() - 0.02
+    threading.Timer(0.01, trigger.fire, args=(cued,)).start()
+    assert trigger.wait(1.0)
+    # a late cue reports the latency from its cue time
+    assert trigger.latency >= 0.02
+    # fired once per arm
+    trigger.fire()
+    assert trigger.wait(0)
+    assert trigger.count == 1
+
+
+def test_on_idle_runs_on_the_waiting_thread(monkeypatch):
+    monkeypatch.setattr(triggers, 'WAIT_SLICE', 0.01)
+    trigger = TriggerScheduler('SYNC', 0)
+    calls = []
+    trigger.on_idle = lambda: calls.append(threading.current_thread())
+    trigger.arm()
+    assert not trigger.wait(0.05)
+    assert len(calls) > 1 and set(calls) == {threading.current_thread()}
+    del calls[:]
+    trigger.fire()
+    assert trigger.wait(1.0)
+    # not once it has fired
+    assert calls == []
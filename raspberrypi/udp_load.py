@@ -0,0 +1,146 @@
+import argparse
+import math
+import random
+import socket
+import time
+import instrument
+from servo_client import ServoClient
+
+# Synthetic load for servo_server.py: sends commands at a fixed packet rate with
+# a chosen axis pattern, then reports what the server did with them, read from
+# its stats endpoint (servo_server.py --stats-port, on the same machine):
+#
+#   python3 udp_load.py --rate 500 --duration 10 --pattern sine --axes Base,Pitch,Tilt
+#   python3 udp_load.py --rate 0 --batch 4          (as fast as possible, 4 frames per datagram)
+#
+# Reported: achieved send rate, server throughput, drop rate (datagrams sent
+# but never received), out of order / coalesced frames and the server's
+# receive-to-apply latency over just this run.
+
+# seconds to wait after the last packet for the server to catch up
+SETTLE = 0.5
+
+
+def sine(t, phase, amplitude, freq):
+    return amplitude * math.sin(2 * math.pi * (freq * t + phase))
+
+def sweep(t, phase, amplitude, freq):
+    # triangle wave
+    p = (freq * t + phase) % 1.0
+    return amplitude * (4 * p - 1 if p < 0.5 else 3 - 4 * p)
+
+def step(t, phase, amplitude, freq):
+    return amplitude if (freq * t + phase) % 1.0 < 0.5 else -amplitude
+
+def uniform(t, phase, amplitude, freq):
+    return random.uniform(-amplitude, amplitude)
+
+PATTERNS = {
+    'sine': sine,
+    'sweep': sweep,
+    'step': step,
+    'random': uniform,
+}
+
+
+def generate(client, axes, pattern, rate, duration, batch=1, amplitude=30.0, freq=0.5, text=False):
+    """Sends for duration seconds at rate datagrams/s (0: as fast as possible).
+    Returns (datagrams sent, frames sent, seconds taken)"""
+    wave = PATTERNS[pattern]
+    # axes move out of phase, so every frame differs on every axis
+    phases = {name: i / len(axes) for i, name in enumerate(axes)}
+    period = 1.0 / rate if rate > 0 else 0.0
+    datagrams = frames = 0
+    start = deadline = time.monotonic()
+    end = start + duration
+    while True:
+        now = time.monotonic()
+        if now >= end:
+            break
+        t = now - start
+        if text:
+            client.send_text(' '.join(f"{name[0]}{wave(t, phases[name], amplitude, freq):.2f}"
+                                      for name in axes))
+            frames += 1
+        else:
+            angles = {name: wave(t, phases[name], amplitude, freq) for name in axes}
+            if batch > 1:
+                client.send_batch([angles] * batch)
+            else:
+                client.send(**angles)
+            frames += batch
+        datagrams += 1
+        if period:
+            deadline += period
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif -delay > 1.0:
+                # a second behind: don't burst to catch up
+                deadline = time.monotonic()
+    return datagrams, frames, time.monotonic() - start
+
+
+def delta(before, after, name):
+    counters = after['counters'], before['counters']
+    return counters[0].get(name, {}).get('total', 0) - counters[1].get(name, {}).get('total', 0)
+
+
+def report(datagrams, frames, elapsed, before, after):
+    print(f"Sent {datagrams} datagrams ({frames} frames) in {elapsed:.2f} s: "
+          f"{datagrams / elapsed:.0f} datagrams/s, {frames / elapsed:.0f} frames/s")
+    if before is None or after is None:
+        print("No stats from the server (is servo_server.py running here with --stats-port?)")
+        return
+    received = delta(before, after, 'udp.packets')
+    print(f"Server received {received} datagrams ({received / elapsed:.0f}/s), "
+          f"drop rate {max(0, datagrams - received) / datagrams * 100 if datagrams else 0:.2f}%, "
+          f"{delta(before, after, 'udp.bad')} bad, "
+          f"{delta(before, after, 'udp.out_of_order')} out of order, "
+          f"{delta(before, after, 'udp.coalesced')} coalesced, "
+          f"{delta(before, after, 'servo.writes')} servo writes")
+    latency = after['rings'].get('udp.receive_to_apply')
+    if latency and latency['count']:
+        print(f"Receive-to-apply latency: mean {latency['mean_ms']:.3f} ms, p50 {latency['p50_ms']:.3f}, "
+              f"p99 {latency['p99_ms']:.3f}, max {latency['max_ms']:.3f} ms "
+              f"({latency['count']} samples)")
+
+
+def stats(port, since=None):
+    try:
+        return instrument.query(port, since=since)
+    except (socket.timeout, OSError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic UDP load for servo_server.py")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8888)
+    parser.add_argument('--rate', type=float, default=100.0,
+                        help="datagrams per second, 0 for as fast as possible (default 100)")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds (default 10)")
+    parser.add_argument('--batch', type=int, default=1, help="binary frames per datagram (default 1)")
+    parser.add_argument('--axes', default='Base,Pitch,Tilt',
+                        help="comma separated axes to move (default Base,Pitch,Tilt)")
+    parser.add_argument('--pattern', choices=sorted(PATTERNS), default='sine')
+    parser.add_argument('--amplitude', type=float, default=30.0, help="degrees (default 30)")
+    parser.add_argument('--freq', type=float, default=0.5, help="pattern frequency in Hz (default 0.5)")
+    parser.add_argument('--text', action='store_true', help="send text commands instead of binary frames")
+    parser.add_argument('--stats-port', type=int, default=instrument.DEFAULT_PORT,
+                        help=f"servo_server.py's stats port on this machine (default {instrument.DEFAULT_PORT})")
+    args = parser.parse_args()
+
+    axes = [name.strip() for name in args.axes.split(',') if name.strip()]
+    before = stats(args.stats_port)
+    with ServoClient(args.host, args.port) as client:
+        print(f"Sending {args.pattern} on {', '.join(axes)} to {args.host}:{args.port} "
+              f"at {'max' if args.rate <= 0 else f'{args.rate:g}'} datagrams/s for {args.duration:g} s")
+        try:
+            sent = generate(client, axes, args.pattern, args.rate, args.duration,
+                            args.batch, args.amplitude, args.freq, args.text)
+        except KeyboardInterrupt:
+            raise SystemExit("Stopped")
+    time.sleep(SETTLE)
+    after = stats(args.stats_port, since=before) if before is not None else None
+    report(*sent, before, after)
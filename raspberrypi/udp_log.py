@@ -0,0 +1,204 @@
+import argparse
+import socket
+import struct
+import time
+
+# Append-only capture of the UDP servo command stream, and replay of it.
+#
+# Layout, all little endian:
+#   header   4s magic b'SKUL', H version, H reserved, d wall clock start (time.time())
+#   records  d receive time (seconds since the start, time.monotonic()),
+#            4s sender IPv4 address, H sender port, H datagram length,
+#            then the datagram itself
+#
+# Records are only ever appended, through a buffered file, so capturing costs
+# one memory copy per datagram; a log cut short by a crash or power loss reads
+# fine up to its last complete record.
+#
+#   python3 servo_server.py --capture session.skul      (log what the server receives)
+#   python3 udp_log.py capture session.skul --port 8890 --forward 127.0.0.1:8888
+#   python3 udp_log.py replay session.skul --speed 4     (or --speed 0 for max speed)
+#   python3 udp_log.py info session.skul
+MAGIC = b'SKUL'
+LOG_VERSION = 1
+HEADER = struct.Struct('<4sHHd')
+RECORD = struct.Struct('<d4sHH')
+
+# flush the file at least this often while capturing
+FLUSH_EVERY = 1.0
+
+
+class LogFormatError(ValueError):
+    pass
+
+
+class LogWriter:
+    """Appends received datagrams to a new log file; an existing file is never
+    overwritten (FileExistsError)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, 'xb')
+        self.f.write(HEADER.pack(MAGIC, LOG_VERSION, 0, time.time()))
+        self.start = time.monotonic()
+        self.next_flush = self.start + FLUSH_EVERY
+        self.count = 0
+
+    def add(self, data, addr, now=None):
+        """Logs one datagram; now is its receive time.monotonic()"""
+        if now is None:
+            now = time.monotonic()
+        self.f.write(RECORD.pack(now - self.start, socket.inet_aton(addr[0]), addr[1], len(data)))
+        self.f.write(data)
+        self.count += 1
+        if now >= self.next_flush:
+            self.next_flush = now + FLUSH_EVERY
+            self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read(path):
+    """Yields (time, (host, port), data) for every complete record in a log"""
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) != HEADER.size:
+            raise LogFormatError(f"{path}: too short for a UDP log")
+        magic, version, _, _ = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise LogFormatError(f"{path}: not a UDP log")
+        if version != LOG_VERSION:
+            raise LogFormatError(f"{path}: unsupported log version {version}")
+        while True:
+            record = f.read(RECORD.size)
+            if len(record) != RECORD.size:
+                return
+            t, host, port, length = RECORD.unpack(record)
+            data = f.read(length)
+            if len(data) != length:
+                return
+            yield t, (socket.inet_ntoa(host), port), data
+
+
+def capture(path, port=8888, forward=None, duration=None):
+    """Logs every datagram arriving on port, optionally relaying it to forward
+    from a socket per original sender (like replay)"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('0.0.0.0', port))
+    sock.settimeout(0.5)
+    try:
+        log = LogWriter(path)
+    except FileExistsError:
+        sock.close()
+        raise
+    relays = {}
+    print(f"Capturing UDP port {port} to {path}. Press CTRL+C to stop.")
+    with log:
+        try:
+            while duration is None or time.monotonic() - log.start < duration:
+                try:
+                    data, addr = sock.recvfrom(4096)
+                except socket.timeout:
+                    continue
+                log.add(data, addr)
+                if forward is not None:
+                    relay = relays.get(addr)
+                    if relay is None:
+                        relay = relays[addr] = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                    relay.sendto(data, forward)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sock.close()
+            for relay in relays.values():
+                relay.close()
+        print(f"Captured {log.count} datagrams to {path}")
+
+
+def replay(path, address, speed=1.0):
+    """Sends a log to address with its original timing divided by speed
+    (speed 0: as fast as possible). Every original sender gets its own socket,
+    so the server's per-sender sequence filtering sees the same streams"""
+    sockets = {}
+    sent = 0
+    late_max = 0.0
+    start = time.monotonic()
+    try:
+        for t, sender, data in read(path):
+            if speed > 0:
+                due = start + t / speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    late_max = max(late_max, -delay)
+            sock = sockets.get(sender)
+            if sock is None:
+                sock = sockets[sender] = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.sendto(data, address)
+            sent += 1
+    finally:
+        for sock in sockets.values():
+            sock.close()
+    elapsed = time.monotonic() - start
+    print(f"Replayed {sent} datagrams from {len(sockets)} sender(s) in {elapsed:.2f} s"
+          + (f", at most {late_max * 1000:.1f} ms late" if speed > 0 else ""))
+    return sent, elapsed
+
+
+def info(path):
+    count = size = 0
+    senders = set()
+    last = 0.0
+    for t, sender, data in read(path):
+        count += 1
+        size += len(data)
+        senders.add(sender)
+        last = t
+    rate = count / last if last else 0.0
+    print(f"{path}: {count} datagrams ({size} bytes) from {len(senders)} sender(s) "
+          f"over {last:.2f} s, {rate:.1f}/s")
+
+
+def address(value):
+    host, _, port = value.rpartition(':')
+    return host, int(port)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Capture and replay the UDP servo command stream")
+    commands = parser.add_subparsers(dest='command', required=True)
+    p = commands.add_parser('capture', help="log every datagram arriving on a port")
+    p.add_argument('log')
+    p.add_argument('--port', type=int, default=8888)
+    p.add_argument('--forward', type=address, default=None,
+                   help="host:port of a servo_server to relay packets to")
+    p.add_argument('--duration', type=float, default=None, help="stop after this many seconds")
+    p = commands.add_parser('replay', help="send a log to a servo_server")
+    p.add_argument('log')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8888)
+    p.add_argument('--speed', type=float, default=1.0,
+                   help="1 for real time, N for N times faster, 0 for as fast as possible")
+    p = commands.add_parser('info', help="summarize a log")
+    p.add_argument('log')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'capture':
+            capture(args.log, args.port, args.forward, args.duration)
+        elif args.command == 'replay':
+            replay(args.log, (args.host, args.port), args.speed)
+        else:
+            info(args.log)
+    except KeyboardInterrupt:
+        print("Stopped")
+    except FileExistsError:
+        parser.error(f"{args.log} already exists, capture to a new file")